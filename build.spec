@@ -22,6 +22,12 @@ sklearn_hiddenimports = [
     'sklearn.utils._typedefs',
 ]
 
+# scipy 层次聚类
+scipy_hiddenimports = [
+    'scipy.cluster.hierarchy',
+    'scipy.spatial.distance',
+]
+
 a = Analysis(
     ['src/main.py'],
     pathex=['src'],
@@ -31,7 +37,7 @@ a = Analysis(
         ('src/core', 'core'),
         ('app.ico', '.'),  # 图标文件
     ],
-    hiddenimports=pyqt6_hiddenimports + sklearn_hiddenimports + [
+    hiddenimports=pyqt6_hiddenimports + sklearn_hiddenimports + scipy_hiddenimports + [
         'numpy', 
         'numpy.core._methods', 
         'numpy.lib.format',
@@ -18,31 +18,68 @@ from .models import (
     ClusterInfo,
     AdvancedClassificationResult,
 )
-from .scanner import ImageScanner, PathNotFoundError, AccessDeniedError
-from .extractor import ColorExtractor
-from .category_manager import CategoryManager
-from .rollback_manager import RollbackManager
 
-# 高级分类模块
-from .advanced_extractor import AdvancedFeatureExtractor
-from .histogram_analyzer import HistogramAnalyzer
-from .similarity_calculator import SimilarityCalculator
-from .adaptive_clusterer import AdaptiveClusterer, ClusterResult
-from .category_namer import CategoryNamer
+# 其余模块按需导入，避免启动时就加载 numpy/scipy/PIL/PyQt6 等重量级依赖
+_LAZY_IMPORTS = {
+    "ImageScanner": ".scanner",
+    "PathNotFoundError": ".scanner",
+    "AccessDeniedError": ".scanner",
+    "ColorExtractor": ".extractor",
+    "CategoryManager": ".category_manager",
+    "RollbackManager": ".rollback_manager",
+    "ProgressTracker": ".progress_tracker",
+    "PreviewGenerator": ".preview_generator",
+    "ClassificationEngine": ".engine",
+    # 高级分类模块
+    "AdvancedFeatureExtractor": ".advanced_extractor",
+    "HistogramAnalyzer": ".histogram_analyzer",
+    "SimilarityCalculator": ".similarity_calculator",
+    "AdaptiveClusterer": ".adaptive_clusterer",
+    "ClusterResult": ".adaptive_clusterer",
+    "CategoryNamer": ".category_namer",
+    "AdvancedClassificationEngine": ".advanced_engine",
+}
+
+__all__ = [
+    "ColorCategory",
+    "ScanResult",
+    "ColorInfo",
+    "ColorExtractionResult",
+    "MoveRecord",
+    "RollbackResult",
+    "ClassificationResult",
+    "TonalClass",
+    "HueCategory",
+    "SaturationLevel",
+    "DistanceMetric",
+    "ImageFeatures",
+    "FeatureWeights",
+    "ClusterInfo",
+    "AdvancedClassificationResult",
+    "ImageScanner",
+    "PathNotFoundError",
+    "AccessDeniedError",
+    "ColorExtractor",
+    "CategoryManager",
+    "RollbackManager",
+    "AdvancedFeatureExtractor",
+    "HistogramAnalyzer",
+    "SimilarityCalculator",
+    "AdaptiveClusterer",
+    "ClusterResult",
+    "CategoryNamer",
+    # 依赖 PyQt6 的 ProgressTracker、PreviewGenerator、ClassificationEngine
+    # 不放入 __all__，星号导入时不会触发 PyQt6 加载
+]
+
 
-# Lazy import for ProgressTracker, PreviewGenerator, and ClassificationEngine
-# to avoid PyQt6 import issues when not needed
 def __getattr__(name):
-    if name == "ProgressTracker":
-        from .progress_tracker import ProgressTracker
-        return ProgressTracker
-    if name == "PreviewGenerator":
-        from .preview_generator import PreviewGenerator
-        return PreviewGenerator
-    if name == "ClassificationEngine":
-        from .engine import ClassificationEngine
-        return ClassificationEngine
-    if name == "AdvancedClassificationEngine":
-        from .advanced_engine import AdvancedClassificationEngine
-        return AdvancedClassificationEngine
-    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到模块命名空间，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
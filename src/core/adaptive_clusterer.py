@@ -7,10 +7,73 @@
 import numpy as np
 from typing import Optional
 from dataclasses import dataclass
+from scipy.cluster.hierarchy import linkage
+from scipy.spatial.distance import squareform
 
 from .models import ImageFeatures
 
 
+def _num_samples(condensed: np.ndarray) -> int:
+    """由压缩距离向量的长度 N(N-1)/2 反推样本数 N"""
+    return int(round((1 + np.sqrt(1 + 8 * len(condensed))) / 2))
+
+
+def _cut_tree(linkage_matrix: np.ndarray, n_clusters: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    执行链接矩阵的前 N - K 次合并，切出恰好 K 个簇
+    
+    fcluster 的 maxclust 在合并高度相同时可能切出少于 K 个簇，
+    这里按合并次数切割，与合并顺序严格对应。
+    
+    Args:
+        linkage_matrix: 链接矩阵
+        n_clusters: 目标簇数量 K
+        
+    Returns:
+        (每个簇对应的树节点编号 (K,), 每个样本的簇标签 (N,)，标签为 0..K-1)
+    """
+    n = linkage_matrix.shape[0] + 1
+    n_merges = n - n_clusters
+    children = linkage_matrix[:n_merges, :2].astype(np.intp)
+    owner = np.arange(n + n_merges)
+    owner[children.ravel()] = np.repeat(np.arange(n, n + n_merges), 2)
+    # 父节点编号总是大于子节点，倒序一遍即可解析到根
+    for node in range(n + n_merges - 1, -1, -1):
+        owner[node] = owner[owner[node]]
+    return np.unique(owner[:n], return_inverse=True)
+
+
+def _cluster_sums(distances: np.ndarray, inverse: np.ndarray, n_clusters: int) -> np.ndarray:
+    """
+    计算每个点到各簇所有点的距离和
+    
+    方阵直接用矩阵乘法；压缩向量逐行累加，不展开 N×N 矩阵，
+    内存只需 O(N·K)。
+    
+    Args:
+        distances: N×N 距离方阵或压缩距离向量
+        inverse: (N,) 每个点所在簇的列号
+        n_clusters: 簇数 K
+        
+    Returns:
+        (N, K) 距离和矩阵
+    """
+    if distances.ndim == 2:
+        membership = inverse[:, None] == np.arange(n_clusters)[None, :]
+        return distances @ membership.astype(distances.dtype)
+    
+    n = len(inverse)
+    sums = np.zeros((n, n_clusters), dtype=distances.dtype)
+    start = 0
+    for i in range(n - 1):
+        # 第 i 行在压缩向量中对应 (i, i+1..n-1)
+        row = distances[start:start + n - i - 1]
+        start += n - i - 1
+        sums[i] += np.bincount(inverse[i + 1:], weights=row, minlength=n_clusters)
+        sums[i + 1:, inverse[i]] += row
+    return sums
+
+
 @dataclass
 class ClusterResult:
     """聚类结果"""
@@ -27,6 +90,11 @@ class AdaptiveClusterer:
     使用层次聚类（Ward链接）和轮廓系数自动确定最佳聚类数。
     """
     
+    # 样本数不超过该值时展开为方阵计算轮廓系数，否则直接使用压缩向量
+    SQUARE_MAX_SAMPLES = 4000
+    # 样本数不超过该值时按链接高度的最大跳变选 k，不做轮廓系数搜索
+    GAP_MAX_SAMPLES = 20
+    
     def __init__(self,
                  min_clusters: int = 2,
                  max_clusters: int = 10,
@@ -43,199 +111,97 @@ class AdaptiveClusterer:
         self.max_clusters = max_clusters
         self.linkage = linkage
     
-    def _compute_condensed_distance(self, distance_matrix: np.ndarray) -> np.ndarray:
-        """
-        将方阵距离矩阵转换为压缩形式（上三角）
-        
-        Args:
-            distance_matrix: N×N 距离矩阵
-            
-        Returns:
-            压缩距离向量
-        """
-        n = distance_matrix.shape[0]
-        condensed = []
-        for i in range(n):
-            for j in range(i + 1, n):
-                condensed.append(distance_matrix[i, j])
-        return np.array(condensed)
-    
-    def _hierarchical_linkage(self, distance_matrix: np.ndarray) -> np.ndarray:
+    def _hierarchical_linkage(self, condensed: np.ndarray) -> np.ndarray:
         """
         执行层次聚类，返回链接矩阵
         
-        使用简化的 Ward 方法实现
+        使用 scipy 的最近邻链（NN-chain）实现，时间复杂度 O(n²)。
         
         Args:
-            distance_matrix: N×N 距离矩阵
+            condensed: 压缩距离向量，长度 N(N-1)/2
             
         Returns:
             链接矩阵 (n-1, 4): [cluster1, cluster2, distance, size]
         """
-        n = distance_matrix.shape[0]
-        
-        # 复制距离矩阵
-        dist = distance_matrix.copy()
-        
-        # 初始化：每个点是一个簇
-        cluster_sizes = {i: 1 for i in range(n)}
-        active_clusters = set(range(n))
-        
-        linkage_matrix = []
-        next_cluster_id = n
-        
-        for _ in range(n - 1):
-            # 找到最近的两个簇
-            min_dist = np.inf
-            merge_i, merge_j = -1, -1
-            
-            active_list = sorted(active_clusters)
-            for idx_i, i in enumerate(active_list):
-                for j in active_list[idx_i + 1:]:
-                    if dist[i, j] < min_dist:
-                        min_dist = dist[i, j]
-                        merge_i, merge_j = i, j
-            
-            if merge_i == -1:
-                break
-            
-            # 记录合并
-            size_new = cluster_sizes[merge_i] + cluster_sizes[merge_j]
-            linkage_matrix.append([merge_i, merge_j, min_dist, size_new])
-            
-            # 更新距离（Ward方法）
-            for k in active_clusters:
-                if k != merge_i and k != merge_j:
-                    ni = cluster_sizes[merge_i]
-                    nj = cluster_sizes[merge_j]
-                    nk = cluster_sizes[k]
-                    
-                    # Ward 距离更新公式
-                    d_ik = dist[merge_i, k] if merge_i < k else dist[k, merge_i]
-                    d_jk = dist[merge_j, k] if merge_j < k else dist[k, merge_j]
-                    d_ij = min_dist
-                    
-                    new_dist = np.sqrt(
-                        ((ni + nk) * d_ik ** 2 + 
-                         (nj + nk) * d_jk ** 2 - 
-                         nk * d_ij ** 2) / (ni + nj + nk)
-                    )
-                    
-                    # 更新距离矩阵
-                    if merge_i < k:
-                        dist[merge_i, k] = new_dist
-                    else:
-                        dist[k, merge_i] = new_dist
-            
-            # 更新簇信息
-            cluster_sizes[merge_i] = size_new
-            active_clusters.remove(merge_j)
-        
-        return np.array(linkage_matrix)
+        return linkage(condensed, method=self.linkage)
 
-    def _cut_tree(self, linkage_matrix: np.ndarray, n_clusters: int, n_samples: int) -> np.ndarray:
+    @staticmethod
+    def _silhouette_from_sums(cluster_sums: np.ndarray,
+                              cluster_sizes: np.ndarray,
+                              inverse: np.ndarray) -> float:
         """
-        从链接矩阵中切割出指定数量的簇
+        由每个点到各簇的距离和计算轮廓系数
         
         Args:
-            linkage_matrix: 链接矩阵
-            n_clusters: 目标簇数量
-            n_samples: 原始样本数量
+            cluster_sums: (N, K) 点 i 到簇 c 所有点的距离和，空簇列会被忽略
+            cluster_sizes: (K,) 簇大小，0 表示该列不是有效簇
+            inverse: (N,) 每个点所在簇的列号
             
         Returns:
-            标签数组
+            轮廓系数 [-1, 1]
         """
-        # 初始化：每个点是自己的簇
-        labels = np.arange(n_samples)
+        n = len(inverse)
+        rows = np.arange(n)
         
-        # 需要执行的合并次数
-        n_merges = n_samples - n_clusters
+        # a(i): 与同簇其他点的平均距离（对角线为 0，自身不计入）
+        own_sizes = cluster_sizes[inverse] - 1
+        a = np.divide(cluster_sums[rows, inverse], own_sizes,
+                      out=np.zeros(n), where=own_sizes > 0)
         
-        for i in range(min(n_merges, len(linkage_matrix))):
-            c1, c2 = int(linkage_matrix[i, 0]), int(linkage_matrix[i, 1])
-            
-            # 找到属于 c2 的所有点，合并到 c1
-            # 注意：c1, c2 可能是原始点或合并后的簇
-            mask = (labels == c2) | (labels == c1)
-            new_label = min(c1, c2)
-            labels[mask] = new_label
-        
-        # 重新编号标签为 0, 1, 2, ...
-        unique_labels = np.unique(labels)
-        label_map = {old: new for new, old in enumerate(unique_labels)}
-        labels = np.array([label_map[l] for l in labels])
-        
-        return labels
+        # b(i): 与最近其他簇的平均距离
+        cluster_means = np.divide(cluster_sums, cluster_sizes,
+                                  out=np.full(cluster_sums.shape, np.inf),
+                                  where=cluster_sizes > 0)
+        cluster_means[rows, inverse] = np.inf
+        b = cluster_means.min(axis=1)
+        
+        # 轮廓值
+        max_ab = np.maximum(a, b)
+        silhouette_values = np.divide(b - a, max_ab,
+                                      out=np.zeros(n), where=max_ab > 0)
+        
+        return float(np.mean(silhouette_values))
     
     def _compute_silhouette_score(self, distance_matrix: np.ndarray, labels: np.ndarray) -> float:
         """
         计算轮廓系数
         
         Args:
-            distance_matrix: N×N 距离矩阵
+            distance_matrix: N×N 距离矩阵或压缩距离向量
             labels: 聚类标签
             
         Returns:
             轮廓系数 [-1, 1]
         """
         n = len(labels)
-        unique_labels = np.unique(labels)
+        unique_labels, inverse = np.unique(labels, return_inverse=True)
         n_clusters = len(unique_labels)
         
         if n_clusters <= 1 or n_clusters >= n:
             return 0.0
         
-        silhouette_values = []
-        
-        for i in range(n):
-            label_i = labels[i]
-            
-            # 计算 a(i): 与同簇其他点的平均距离
-            same_cluster = np.where(labels == label_i)[0]
-            same_cluster = same_cluster[same_cluster != i]
-            
-            if len(same_cluster) == 0:
-                a_i = 0.0
-            else:
-                a_i = np.mean([distance_matrix[i, j] for j in same_cluster])
-            
-            # 计算 b(i): 与最近其他簇的平均距离
-            b_i = np.inf
-            for other_label in unique_labels:
-                if other_label == label_i:
-                    continue
-                other_cluster = np.where(labels == other_label)[0]
-                if len(other_cluster) > 0:
-                    avg_dist = np.mean([distance_matrix[i, j] for j in other_cluster])
-                    b_i = min(b_i, avg_dist)
-            
-            if b_i == np.inf:
-                b_i = 0.0
-            
-            # 计算轮廓值
-            max_ab = max(a_i, b_i)
-            if max_ab > 0:
-                s_i = (b_i - a_i) / max_ab
-            else:
-                s_i = 0.0
-            
-            silhouette_values.append(s_i)
+        cluster_sums = _cluster_sums(distance_matrix, inverse, n_clusters)
+        cluster_sizes = np.bincount(inverse, minlength=n_clusters)
         
-        return float(np.mean(silhouette_values))
+        return self._silhouette_from_sums(cluster_sums, cluster_sizes, inverse)
     
     def _find_optimal_k(self, distance_matrix: np.ndarray, 
                         linkage_matrix: np.ndarray) -> tuple[int, float]:
         """
         使用轮廓系数找到最佳聚类数
         
+        只在最细划分（k = max_k）上计算一次点到簇的距离和，
+        之后沿链接矩阵向上合并：两簇合并时把对应两列相加，
+        每个 k 的轮廓系数只需 O(N·K)。
+        
         Args:
-            distance_matrix: N×N 距离矩阵
+            distance_matrix: N×N 距离矩阵或压缩距离向量
             linkage_matrix: 链接矩阵
             
         Returns:
             (最佳聚类数, 最佳轮廓系数)
         """
-        n = distance_matrix.shape[0]
+        n = linkage_matrix.shape[0] + 1
         
         # 调整搜索范围
         min_k = max(2, self.min_clusters)
@@ -244,32 +210,83 @@ class AdaptiveClusterer:
         if min_k > max_k:
             return min_k, 0.0
         
-        best_k = min_k
-        best_score = -1.0
+        # 执行前 n - max_k 次合并，得到每个叶子所属的节点
+        n_merges = n - max_k
+        children = linkage_matrix[:, :2].astype(np.intp)
+        roots, inverse = _cut_tree(linkage_matrix, max_k)
+        node_col = np.full(2 * n - 1, -1, dtype=np.intp)
+        node_col[roots] = np.arange(max_k)
+        
+        cluster_sums = _cluster_sums(distance_matrix, inverse, max_k)
+        cluster_sizes = np.bincount(inverse, minlength=max_k)
+        
+        best_k = max_k
+        best_score = self._silhouette_from_sums(cluster_sums, cluster_sizes, inverse)
         
-        for k in range(min_k, max_k + 1):
-            labels = self._cut_tree(linkage_matrix, k, n)
-            score = self._compute_silhouette_score(distance_matrix, labels)
+        for step in range(n_merges, n - min_k):
+            a, b = node_col[children[step]]
+            cluster_sums[:, a] += cluster_sums[:, b]
+            cluster_sizes[a] += cluster_sizes[b]
+            cluster_sizes[b] = 0
+            inverse[inverse == b] = a
+            node_col[n + step] = a
             
-            if score > best_score:
+            k = n - step - 1
+            score = self._silhouette_from_sums(cluster_sums, cluster_sizes, inverse)
+            
+            # 分数相同时取较小的 k
+            if score >= best_score:
                 best_score = score
                 best_k = k
         
         return best_k, best_score
     
+    def _find_k_by_gap(self, linkage_matrix: np.ndarray) -> int:
+        """
+        按链接高度的最大跳变确定聚类数
+        
+        切成 k 类时，下一次合并（第 n-k 次）的高度跳变越大，
+        说明这 k 个簇之间分得越开。
+        
+        Args:
+            linkage_matrix: 链接矩阵
+            
+        Returns:
+            聚类数
+        """
+        n = linkage_matrix.shape[0] + 1
+        min_k = max(2, self.min_clusters)
+        max_k = min(n - 1, self.max_clusters)
+        
+        if min_k > max_k:
+            return min_k
+        
+        heights = linkage_matrix[:, 2]
+        ks = np.arange(min_k, max_k + 1)
+        gaps = heights[n - ks] - heights[n - ks - 1]
+        
+        # 跳变相同时取较小的 k
+        return int(ks[np.argmax(gaps)])
+    
     def cluster(self, distance_matrix: np.ndarray,
-                n_clusters: Optional[int] = None) -> ClusterResult:
+                n_clusters: Optional[int] = None,
+                linkage_matrix: Optional[np.ndarray] = None) -> ClusterResult:
         """
         执行聚类
         
         Args:
-            distance_matrix: N×N 距离矩阵
+            distance_matrix: 压缩距离向量（scipy pdist 布局），也接受 N×N 方阵
             n_clusters: 指定聚类数，None 则自动确定
+            linkage_matrix: 已计算好的链接矩阵，None 则重新计算
             
         Returns:
             ClusterResult 对象
         """
-        n = distance_matrix.shape[0]
+        # 统一使用 float32，减半后续方阵和轮廓系数计算的内存带宽
+        condensed = np.asarray(distance_matrix, dtype=np.float32)
+        if condensed.ndim == 2:
+            condensed = squareform(condensed, checks=False)
+        n = _num_samples(condensed)
         
         if n < 2:
             return ClusterResult(
@@ -279,15 +296,34 @@ class AdaptiveClusterer:
             )
         
         # 执行层次聚类
-        linkage_matrix = self._hierarchical_linkage(distance_matrix)
+        if linkage_matrix is None:
+            linkage_matrix = self._hierarchical_linkage(condensed)
         
-        if n_clusters is None:
+        # 样本较少时临时展开为方阵，用矩阵乘法求簇距离和
+        if n <= self.SQUARE_MAX_SAMPLES:
+            distance_matrix = squareform(condensed, checks=False)
+        else:
+            distance_matrix = condensed
+        
+        if n_clusters is None and n <= self.GAP_MAX_SAMPLES:
+            # 样本很少时轮廓系数搜索意义不大，直接按高度跳变选 k
+            n_clusters = self._find_k_by_gap(linkage_matrix)
+            _, labels = _cut_tree(linkage_matrix, n_clusters)
+            silhouette = self._compute_silhouette_score(distance_matrix, labels)
+            
+            return ClusterResult(
+                labels=labels,
+                n_clusters=n_clusters,
+                silhouette_score=silhouette,
+                linkage_matrix=linkage_matrix
+            )
+        elif n_clusters is None:
             # 自动确定最佳聚类数
             n_clusters, silhouette = self._find_optimal_k(distance_matrix, linkage_matrix)
         else:
             # 使用指定的聚类数
             n_clusters = max(1, min(n_clusters, n))
-            labels = self._cut_tree(linkage_matrix, n_clusters, n)
+            _, labels = _cut_tree(linkage_matrix, n_clusters)
             silhouette = self._compute_silhouette_score(distance_matrix, labels)
             
             return ClusterResult(
@@ -298,7 +334,7 @@ class AdaptiveClusterer:
             )
         
         # 使用最佳聚类数切割
-        labels = self._cut_tree(linkage_matrix, n_clusters, n)
+        _, labels = _cut_tree(linkage_matrix, n_clusters)
         
         return ClusterResult(
             labels=labels,
@@ -4,11 +4,16 @@
 整合所有高级分类组件，提供完整的图片颜色分类功能。
 """
 
+import errno
 import os
 import shutil
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, Callable
 
+import numpy as np
+
 from .models import (
     ImageFeatures,
     FeatureWeights,
@@ -23,12 +28,71 @@ from .models import (
 )
 from .advanced_extractor import AdvancedFeatureExtractor
 from .similarity_calculator import SimilarityCalculator
-from .adaptive_clusterer import AdaptiveClusterer
-from .category_namer import CategoryNamer
+from .adaptive_clusterer import AdaptiveClusterer, ClusterResult
+from .category_namer import CategoryNamer, cluster_features_to_arrays
 from .scanner import ImageScanner
 from .rollback_manager import RollbackManager
 
 
+def _rename_no_replace(src: str, dst: str) -> None:
+    """
+    在同一卷上移动文件，目标已存在时抛出 FileExistsError，绝不覆盖
+    
+    Raises:
+        FileExistsError: 目标文件已存在
+        OSError: 其他移动错误（跨卷时 errno 为 EXDEV）
+    """
+    if os.name == 'nt':
+        # Windows 上目标存在时 rename 本身就会失败
+        os.rename(src, dst)
+        return
+    
+    # POSIX 上 rename 会覆盖目标；先建硬链接（目标存在时原子地失败）再删除源文件
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno in (errno.EEXIST, errno.EXDEV):
+            raise
+        # 文件系统不支持硬链接：退回先检查再重命名
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+        os.rename(src, dst)
+        return
+    os.unlink(src)
+
+
+def _move_file_safe(src: str, dst: str) -> tuple[str, Optional[str]]:
+    """
+    移动单个文件，同一卷上直接重命名，跨卷时退回 shutil.move
+    
+    目标文件已存在（文件夹在规划后被外部修改，或文件系统不区分大小写）时
+    改用添加数字后缀的文件名，不会覆盖已有文件。
+    
+    Returns:
+        (实际目标路径, 错误信息)，成功时错误信息为 None
+    """
+    parent, filename = os.path.split(dst)
+    base, ext = os.path.splitext(filename)
+    counter = 1
+    try:
+        while True:
+            try:
+                try:
+                    _rename_no_replace(src, dst)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    if os.path.lexists(dst):
+                        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+                    shutil.move(src, dst)
+                return dst, None
+            except FileExistsError:
+                dst = os.path.join(parent, f"{base}_{counter}{ext}")
+                counter += 1
+    except Exception as e:
+        return dst, str(e)
+
+
 class AdvancedClassificationEngine:
     """
     高级分类引擎
@@ -37,11 +101,19 @@ class AdvancedClassificationEngine:
     提供完整的图片颜色分类功能。
     """
     
+    # 图片数量少于该值时在本进程内提取（提取器自身已用线程解码），避免进程启动开销
+    PARALLEL_MIN_IMAGES = 64
+    # 每批交给提取器的最大图片数
+    BATCH_SIZE = 32
+    # 移动文件的线程数（I/O 密集）
+    MOVE_WORKERS = 16
+    
     def __init__(self,
                  feature_extractor: Optional[AdvancedFeatureExtractor] = None,
                  similarity_calculator: Optional[SimilarityCalculator] = None,
                  clusterer: Optional[AdaptiveClusterer] = None,
-                 namer: Optional[CategoryNamer] = None):
+                 namer: Optional[CategoryNamer] = None,
+                 max_workers: Optional[int] = None):
         """
         初始化高级分类引擎
         
@@ -50,14 +122,32 @@ class AdvancedClassificationEngine:
             similarity_calculator: 相似度计算器，None 则使用默认配置
             clusterer: 聚类器，None 则使用默认配置
             namer: 命名器，None 则使用默认配置
+            max_workers: 特征提取进程数，None 则使用 CPU 核心数
         """
         self.feature_extractor = feature_extractor or AdvancedFeatureExtractor()
         self.similarity_calculator = similarity_calculator or SimilarityCalculator()
         self.clusterer = clusterer or AdaptiveClusterer()
         self.namer = namer or CategoryNamer()
+        self.max_workers = max_workers
         self.scanner = ImageScanner()
         self._rollback_manager = RollbackManager()
         self._created_folders: list[str] = []
+        # 预览与分类之间复用的中间结果：{扫描键: {features, distance_matrix, ...}}
+        self._cache: dict = {}
+        # 特征提取进程池，首次需要时创建，在引擎生命周期内复用
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self, workers: int) -> ProcessPoolExecutor:
+        """获取（必要时创建）特征提取进程池"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        return self._executor
+    
+    def close(self) -> None:
+        """关闭特征提取进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
     
     def set_feature_weights(self, weights: FeatureWeights) -> None:
         """设置特征权重"""
@@ -72,6 +162,28 @@ class AdvancedClassificationEngine:
         self.clusterer.min_clusters = min_clusters
         self.clusterer.max_clusters = max_clusters
     
+    def _make_scan_key(self, source_path: str, image_paths: list[str]) -> Optional[tuple]:
+        """
+        生成特征缓存键：图片集合、最新修改时间和提取器配置
+        
+        Args:
+            source_path: 源文件夹路径
+            image_paths: 图片路径列表
+            
+        Returns:
+            可哈希的缓存键；有图片在扫描后被删除或无法访问时返回 None（不使用缓存）
+        """
+        try:
+            max_mtime = max(os.path.getmtime(p) for p in image_paths)
+        except OSError:
+            return None
+        fe = self.feature_extractor
+        extractor_config = (
+            fe.resize_size, fe.hue_bins, fe.lightness_bins, fe.saturation_bins,
+            fe.n_dominant_colors, fe.high_key_threshold, fe.low_key_threshold
+        )
+        return (os.path.abspath(source_path), tuple(image_paths), max_mtime, extractor_config)
+    
     def extract_all_features(self, 
                              image_paths: list[str],
                              progress_callback: Optional[Callable[[int, int, str], None]] = None
@@ -88,18 +200,35 @@ class AdvancedClassificationEngine:
         """
         features = []
         total = len(image_paths)
-        
-        for i, path in enumerate(image_paths):
-            if progress_callback:
-                progress_callback(i + 1, total, f"提取特征: {os.path.basename(path)}")
-            
-            try:
-                feat = self.feature_extractor.extract_features(path)
-                features.append(feat)
-            except Exception as e:
-                # 跳过无法处理的图片
-                print(f"警告: 无法处理图片 {path}: {e}")
-                continue
+        workers = self.max_workers or os.cpu_count() or 1
+        extract = self.feature_extractor.extract_features_batch
+        
+        # 解码和直方图计算是 CPU 密集型且互不相关，按批分发到多个进程
+        if workers > 1 and total >= self.PARALLEL_MIN_IMAGES:
+            batch_size = max(1, min(self.BATCH_SIZE, total // (workers * 4)))
+            batches = [image_paths[i:i + batch_size] for i in range(0, total, batch_size)]
+            results = self._get_executor(workers).map(extract, batches)
+        else:
+            batches = [image_paths[i:i + self.BATCH_SIZE] for i in range(0, total, self.BATCH_SIZE)]
+            results = map(extract, batches)
+        
+        try:
+            current = 0
+            for batch, batch_results in zip(batches, results):
+                for path, (feat, error) in zip(batch, batch_results):
+                    current += 1
+                    if progress_callback:
+                        progress_callback(current, total, f"提取特征: {os.path.basename(path)}")
+                    
+                    if feat is None:
+                        # 跳过无法处理的图片
+                        print(f"警告: 无法处理图片 {path}: {error}")
+                        continue
+                    features.append(feat)
+        except BrokenProcessPool:
+            # 工作进程异常退出后进程池不可再用，丢弃以便下次重建
+            self.close()
+            raise
         
         return features
 
@@ -139,8 +268,13 @@ class AdvancedClassificationEngine:
                 processing_time=time.time() - start_time
             )
         
-        # 2. 提取特征
-        features = self.extract_all_features(image_paths, progress_callback)
+        # 2. 提取特征（预览后再分类时复用缓存）
+        scan_key = self._make_scan_key(source_path, image_paths)
+        cached = self._cache.get(scan_key) if scan_key is not None else None
+        if cached is None:
+            cached = {'features': self.extract_all_features(image_paths, progress_callback)}
+            self._cache = {scan_key: cached} if scan_key is not None else {}
+        features = cached['features']
         
         if len(features) < 2:
             # 图片太少，无法聚类
@@ -161,17 +295,37 @@ class AdvancedClassificationEngine:
                 processing_time=time.time() - start_time
             )
         
-        # 3. 构建距离矩阵
-        if progress_callback:
-            progress_callback(0, 100, "计算相似度...")
-        
-        distance_matrix = self.similarity_calculator.build_distance_matrix(features)
-        
-        # 4. 聚类
-        if progress_callback:
-            progress_callback(0, 100, "执行聚类...")
-        
-        cluster_result = self.clusterer.cluster(distance_matrix, n_clusters)
+        trivial_labels = self._trivial_labels(len(features), n_clusters)
+        if trivial_labels is not None:
+            # 结果与距离无关，跳过距离矩阵和层次聚类
+            cluster_result = ClusterResult(
+                labels=trivial_labels,
+                n_clusters=len(np.unique(trivial_labels)),
+                silhouette_score=0.0
+            )
+        else:
+            # 3. 构建距离矩阵
+            if progress_callback:
+                progress_callback(0, 100, "计算相似度...")
+            
+            weights = self.similarity_calculator.weights
+            distance_key = (weights.hue, weights.lightness, weights.saturation,
+                            self.similarity_calculator.metric)
+            if cached.get('distance_key') != distance_key:
+                cached['distance_key'] = distance_key
+                cached['distance_matrix'] = self.similarity_calculator.build_distance_matrix(features)
+                cached['linkage'] = {}
+            distance_matrix = cached['distance_matrix']
+            
+            # 4. 聚类
+            if progress_callback:
+                progress_callback(0, 100, "执行聚类...")
+            
+            method = self.clusterer.linkage
+            cluster_result = self.clusterer.cluster(
+                distance_matrix, n_clusters, linkage_matrix=cached['linkage'].get(method)
+            )
+            cached['linkage'][method] = cluster_result.linkage_matrix
         
         # 5. 为每个聚类生成名称和信息
         if progress_callback:
@@ -183,6 +337,8 @@ class AdvancedClassificationEngine:
         move_records = []
         if target_path is not None:
             move_records = self._move_files(clusters, target_path, progress_callback)
+            # 文件已移动，缓存的路径失效
+            self._cache.clear()
         
         return AdvancedClassificationResult(
             clusters=clusters,
@@ -193,6 +349,28 @@ class AdvancedClassificationEngine:
             move_records=move_records
         )
     
+    def _trivial_labels(self, n: int, n_clusters: Optional[int]) -> Optional[np.ndarray]:
+        """
+        判断聚类结果是否不依赖距离
+        
+        两张图片自动聚类时轮廓系数无定义，各自成类；
+        指定聚类数不超过 1 时全部归为一类，不小于图片数时每张各成一类。
+        
+        Args:
+            n: 图片数量
+            n_clusters: 指定聚类数，None 表示自动确定
+            
+        Returns:
+            聚类标签，需要正常聚类时返回 None
+        """
+        if n_clusters is None:
+            return np.arange(n) if n == 2 else None
+        if n_clusters <= 1:
+            return np.zeros(n, dtype=int)
+        if n_clusters >= n:
+            return np.arange(n)
+        return None
+    
     def _build_cluster_info(self, 
                             features: list[ImageFeatures],
                             labels: list[int]) -> list[ClusterInfo]:
@@ -206,22 +384,24 @@ class AdvancedClassificationEngine:
         Returns:
             ClusterInfo 列表
         """
-        import numpy as np
+        unique_labels, inverse = np.unique(labels, return_inverse=True)
         
-        unique_labels = np.unique(labels)
-        all_cluster_features = []
+        # 收集每个聚类的特征：稳定排序后按簇大小切分，保持原有顺序
+        order = np.argsort(inverse, kind='stable')
+        boundaries = np.cumsum(np.bincount(inverse))[:-1]
+        all_cluster_features = [
+            [features[i] for i in group] for group in np.split(order, boundaries)
+        ]
         
-        # 收集每个聚类的特征
-        for label in unique_labels:
-            cluster_features = [f for f, l in zip(features, labels) if l == label]
-            all_cluster_features.append(cluster_features)
+        # 每个聚类只堆叠一次特征，命名和详细信息共用
+        all_cluster_arrays = [cluster_features_to_arrays(cf) for cf in all_cluster_features]
         
         # 生成唯一名称
-        names = self.namer.generate_unique_names(all_cluster_features)
+        names = self.namer.generate_unique_names(all_cluster_arrays)
         
         clusters = []
         for i, (label, cluster_features) in enumerate(zip(unique_labels, all_cluster_features)):
-            name, tonal, hue, saturation = self.namer.generate_name_with_details(cluster_features)
+            name, tonal, hue, saturation = self.namer.generate_name_with_details(all_cluster_arrays[i])
             
             # 使用唯一名称
             unique_name = names[i]
@@ -259,48 +439,63 @@ class AdvancedClassificationEngine:
         self._rollback_manager.clear()
         self._created_folders = []
         
-        move_records = []
-        total_files = sum(c.image_count for c in clusters)
-        current = 0
-        
+        # 先规划所有目标路径，重名在内存中解决，不逐个探测磁盘
+        plan = []
+        source_names = []  # 原文件名，进度回调时直接复用
         for cluster in clusters:
             # 创建类别文件夹
             category_path = os.path.join(target_path, cluster.name)
             if not os.path.exists(category_path):
                 os.makedirs(category_path, exist_ok=True)
                 self._created_folders.append(category_path)
+                taken = set()
+            else:
+                # Windows 文件系统不区分大小写，文件名统一按 casefold 比较
+                taken = {name.casefold() for name in os.listdir(category_path)}
+            # 每个 (文件名, 扩展名) 下一个可用的后缀序号
+            next_suffix: dict[tuple[str, str], int] = {}
             
             for image_path in cluster.image_paths:
-                current += 1
+                filename = os.path.basename(image_path)
+                source_names.append(filename)
+                
+                # 处理重名文件：从上次用到的序号继续，同名文件整体只扫描一遍
+                if filename.casefold() in taken:
+                    base, ext = os.path.splitext(filename)
+                    key = (base.casefold(), ext.casefold())
+                    counter = next_suffix.get(key, 1)
+                    while f"{base}_{counter}{ext}".casefold() in taken:
+                        counter += 1
+                    next_suffix[key] = counter + 1
+                    filename = f"{base}_{counter}{ext}"
+                taken.add(filename.casefold())
+                
+                plan.append((image_path, os.path.join(category_path, filename)))
+        
+        move_records = []
+        total_files = len(plan)
+        
+        with ThreadPoolExecutor(max_workers=self.MOVE_WORKERS) as executor:
+            results = executor.map(lambda pair: _move_file_safe(*pair), plan)
+            
+            # map 按提交顺序返回，进度与记录顺序保持不变
+            for current, ((image_path, _), (dest_path, error)) in enumerate(zip(plan, results), 1):
                 if progress_callback:
-                    progress_callback(current, total_files, f"移动文件: {os.path.basename(image_path)}")
+                    progress_callback(current, total_files, f"移动文件: {source_names[current - 1]}")
                 
-                try:
-                    filename = os.path.basename(image_path)
-                    dest_path = os.path.join(category_path, filename)
-                    
-                    # 处理重名文件
-                    if os.path.exists(dest_path):
-                        base, ext = os.path.splitext(filename)
-                        counter = 1
-                        while os.path.exists(dest_path):
-                            dest_path = os.path.join(category_path, f"{base}_{counter}{ext}")
-                            counter += 1
-                    
-                    shutil.move(image_path, dest_path)
-                    
-                    record = MoveRecord(
-                        source_path=image_path,
-                        destination_path=dest_path,
-                        timestamp=time.time()
-                    )
-                    move_records.append(record)
-                    
-                    # 记录到回退管理器
-                    self._rollback_manager.record_move(record)
-                    
-                except Exception as e:
-                    print(f"警告: 无法移动文件 {image_path}: {e}")
+                if error is not None:
+                    print(f"警告: 无法移动文件 {image_path}: {error}")
+                    continue
+                
+                record = MoveRecord(
+                    source_path=image_path,
+                    destination_path=dest_path,
+                    timestamp=time.time()
+                )
+                move_records.append(record)
+                
+                # 记录到回退管理器
+                self._rollback_manager.record_move(record)
         
         # 记录创建的文件夹
         for folder in self._created_folders:
@@ -6,9 +6,16 @@
 """
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from typing import Optional
 
+try:
+    from sklearn.cluster import MiniBatchKMeans
+except ImportError:
+    MiniBatchKMeans = None
+
+from .extractor import _simple_kmeans
 from .models import (
     ImageFeatures, 
     TonalClass, 
@@ -17,37 +24,58 @@ from .models import (
 )
 
 
-def _simple_kmeans(pixels: np.ndarray, n_clusters: int, max_iter: int = 100, random_state: int = 42) -> tuple[np.ndarray, np.ndarray]:
-    """简单的K-Means实现"""
-    np.random.seed(random_state)
-    n_samples = len(pixels)
+def _build_srgb_to_linear_lut() -> np.ndarray:
+    """sRGB 8 位值到线性亮度的查找表（与逐像素 gamma 校正结果相同）"""
+    c = np.arange(256, dtype=np.float32) / 255.0
+    return np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+
+
+_SRGB_TO_LINEAR = _build_srgb_to_linear_lut()
+
+# LAB f(t) 分段点
+_LAB_DELTA = 6 / 29
+
+
+def _lab_f(t: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    LAB 转换中的 f(t)，结果写入 out
     
-    if n_samples < n_clusters:
-        n_clusters = max(1, n_samples)
+    先对整幅图求立方根，再只修正落在线性段的少数暗像素，
+    避免 np.where 对两个分支都做整幅计算。
+    """
+    np.cbrt(t, out=out)
+    small = t <= _LAB_DELTA ** 3
+    if small.any():
+        out[small] = t[small] / (3 * _LAB_DELTA ** 2) + 4 / 29
+    return out
+
+
+def _kmeans(pixels: np.ndarray, n_clusters: int, random_state: int = 42) -> tuple[np.ndarray, np.ndarray]:
+    """
+    K-Means 聚类，优先使用 scikit-learn 的 MiniBatchKMeans
     
-    indices = np.random.choice(n_samples, n_clusters, replace=False)
-    centers = pixels[indices].astype(np.float64)
+    sklearn 未安装时回退到与 ColorExtractor 共用的 _simple_kmeans。
     
-    for _ in range(max_iter):
-        distances = np.zeros((n_samples, n_clusters))
-        for i in range(n_clusters):
-            distances[:, i] = np.sum((pixels - centers[i]) ** 2, axis=1)
-        
-        labels = np.argmin(distances, axis=1)
-        
-        new_centers = np.zeros_like(centers)
-        for i in range(n_clusters):
-            mask = labels == i
-            if np.any(mask):
-                new_centers[i] = pixels[mask].mean(axis=0)
-            else:
-                new_centers[i] = centers[i]
-        
-        if np.allclose(centers, new_centers):
-            break
-        centers = new_centers
+    Args:
+        pixels: 像素数组 (N, 3)
+        n_clusters: 聚类数
+        random_state: 随机种子
+        
+    Returns:
+        (聚类中心, 每个像素的标签)
+    """
+    n_clusters = max(1, min(n_clusters, len(pixels)))
+    if MiniBatchKMeans is None:
+        return _simple_kmeans(pixels, n_clusters, random_state=random_state)
     
-    return centers, labels
+    km = MiniBatchKMeans(
+        n_clusters=n_clusters,
+        n_init=1,
+        max_iter=50,
+        batch_size=4096,
+        random_state=random_state
+    ).fit(pixels)
+    return km.cluster_centers_, km.labels_
 
 
 class AdvancedFeatureExtractor:
@@ -61,8 +89,16 @@ class AdvancedFeatureExtractor:
     - 主色调 (LAB空间K-Means)
     - 影调分类
     - 统计信息
+    
+    色彩转换的中间结果复用实例上的缓冲区，同一实例不要在多个线程中
+    并发调用 extract_features；多线程时每个线程使用各自的实例。
     """
     
+    # 主色调聚类的最大采样像素数，占比估计对采样不敏感
+    DOMINANT_SAMPLE_SIZE = 4000
+    # 批量提取时解码图片的线程数（PIL 解码和缩放会释放 GIL）
+    DECODE_WORKERS = 4
+    
     def __init__(self,
                  resize_size: tuple[int, int] = (200, 200),
                  hue_bins: int = 180,
@@ -90,6 +126,32 @@ class AdvancedFeatureExtractor:
         self.n_dominant_colors = n_dominant_colors
         self.high_key_threshold = high_key_threshold
         self.low_key_threshold = low_key_threshold
+        # 色彩转换的中间缓冲区，按名称复用，尺寸变化时重新分配
+        self._buffers: dict[str, np.ndarray] = {}
+    
+    def __getstate__(self) -> dict:
+        """序列化（发送到工作进程）时不携带缓冲区"""
+        state = self.__dict__.copy()
+        state['_buffers'] = {}
+        return state
+    
+    def _buffer(self, name: str, shape: tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        """
+        取得可复用的中间缓冲区
+        
+        Args:
+            name: 缓冲区名称
+            shape: 所需形状
+            dtype: 数据类型
+            
+        Returns:
+            未初始化的数组，内容在下次同名调用时会被覆盖
+        """
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+        return buf
     
     def _rgb_to_hsv(self, rgb: np.ndarray) -> np.ndarray:
         """
@@ -101,37 +163,31 @@ class AdvancedFeatureExtractor:
         Returns:
             HSV图像数组 (H, W, 3)，H: 0-179, S: 0-255, V: 0-255
         """
-        rgb = rgb.astype(np.float32) / 255.0
-        
-        r, g, b = rgb[:, :, 0], rgb[:, :, 1], rgb[:, :, 2]
-        
-        max_c = np.maximum(np.maximum(r, g), b)
-        min_c = np.minimum(np.minimum(r, g), b)
-        diff = max_c - min_c
+        # 转为连续的平面布局 (3, H, W)，后续逐通道运算不再跨步访问
+        height, width = rgb.shape[:2]
+        planes = self._buffer('rgb_planes', (3, height, width))
+        np.divide(rgb.transpose(2, 0, 1), np.float32(255.0), out=planes)
+        r, g, b = planes
+        
+        max_c = np.maximum(r, g, out=self._buffer('max_c', (height, width)))
+        np.maximum(max_c, b, out=max_c)
+        min_c = np.minimum(r, g, out=self._buffer('min_c', (height, width)))
+        np.minimum(min_c, b, out=min_c)
+        diff = np.subtract(max_c, min_c, out=self._buffer('diff', (height, width)))
         
         # Value
         v = max_c
         
         # Saturation
-        s = np.where(max_c != 0, diff / max_c, 0)
+        s = np.divide(diff, max_c, out=np.zeros_like(max_c), where=max_c != 0)
         
-        # Hue
-        h = np.zeros_like(max_c)
-        
-        # 避免除零
-        mask = diff != 0
-        
-        # Red is max
-        red_mask = mask & (max_c == r)
-        h[red_mask] = (60 * ((g[red_mask] - b[red_mask]) / diff[red_mask]) + 360) % 360
-        
-        # Green is max
-        green_mask = mask & (max_c == g)
-        h[green_mask] = (60 * ((b[green_mask] - r[green_mask]) / diff[green_mask]) + 120) % 360
-        
-        # Blue is max
-        blue_mask = mask & (max_c == b)
-        h[blue_mask] = (60 * ((r[blue_mask] - g[blue_mask]) / diff[blue_mask]) + 240) % 360
+        # Hue：并列最大时按 B > G > R 的优先级选分支，不做掩码散射赋值
+        is_b = b == max_c
+        is_g = g == max_c
+        numer = np.where(is_b, r - g, np.where(is_g, b - r, g - b))
+        offset = np.where(is_b, np.float32(240), np.where(is_g, np.float32(120), np.float32(360)))
+        h = np.divide(numer, diff, out=np.zeros_like(diff), where=diff != 0)
+        h = np.where(diff != 0, (60 * h + offset) % 360, 0)
         
         # 转换到 OpenCV 范围: H: 0-179, S: 0-255, V: 0-255
         h = (h / 2).astype(np.uint8)  # 0-179
@@ -150,15 +206,13 @@ class AdvancedFeatureExtractor:
         Returns:
             LAB图像数组 (H, W, 3)，L: 0-255, a: 0-255, b: 0-255 (偏移后)
         """
-        # RGB to XYZ
-        rgb = rgb.astype(np.float32) / 255.0
-        
-        # sRGB gamma correction
-        mask = rgb > 0.04045
-        rgb_linear = np.where(mask, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+        # sRGB gamma correction：8 位输入直接查表，得到平面布局 (3, H, W)
+        rgb_u8 = rgb.astype(np.uint8, copy=False)
+        rgb_linear = self._buffer('rgb_planes', (3,) + rgb_u8.shape[:2])
+        np.take(_SRGB_TO_LINEAR, rgb_u8.transpose(2, 0, 1), out=rgb_linear)
         
         # RGB to XYZ matrix (D65 illuminant)
-        r, g, b = rgb_linear[:, :, 0], rgb_linear[:, :, 1], rgb_linear[:, :, 2]
+        r, g, b = rgb_linear
         
         x = r * 0.4124564 + g * 0.3575761 + b * 0.1804375
         y = r * 0.2126729 + g * 0.7151522 + b * 0.0721750
@@ -171,11 +225,10 @@ class AdvancedFeatureExtractor:
         y = y / yn
         z = z / zn
         
-        def f(t):
-            delta = 6/29
-            return np.where(t > delta**3, t**(1/3), t / (3 * delta**2) + 4/29)
-        
-        fx, fy, fz = f(x), f(y), f(z)
+        shape = x.shape
+        fx = _lab_f(x, self._buffer('lab_fx', shape))
+        fy = _lab_f(y, self._buffer('lab_fy', shape))
+        fz = _lab_f(z, self._buffer('lab_fz', shape))
         
         L = 116 * fy - 16  # 0-100
         a = 500 * (fx - fy)  # -128 to 127
@@ -200,12 +253,14 @@ class AdvancedFeatureExtractor:
         Returns:
             直方图数组
         """
-        hist, _ = np.histogram(channel.flatten(), bins=bins, range=(0, bins))
+        # 通道为 0..bins-1 的整数，bincount 与 np.histogram 等价且只需一次遍历
+        hist = np.bincount(channel.ravel(), minlength=bins)[:bins]
         
         if normalize:
             total = hist.sum()
             if total > 0:
-                hist = hist.astype(np.float64) / total
+                # 概率分布用 float32 存储，相似度计算时直接堆叠，不必再转换
+                hist = hist.astype(np.float32) / np.float32(total)
         
         return hist
     
@@ -219,14 +274,24 @@ class AdvancedFeatureExtractor:
         Returns:
             LightnessStats 对象
         """
-        flat = lightness.flatten().astype(np.float64)
+        flat = lightness.ravel().astype(np.float32)
+        n = flat.size
+        
+        # 一次性累加一到三阶原点矩，再换算成中心矩
+        # 8 位数据的平方、立方在 float32 中仍是精确整数，只在求和时提升到 float64
+        sq = flat * flat
+        s1 = flat.sum(dtype=np.float64)
+        s2 = sq.sum(dtype=np.float64)
+        s3 = (sq * flat).sum(dtype=np.float64)
         
-        mean = np.mean(flat)
-        std = np.std(flat)
+        mean = s1 / n
+        var = max(s2 / n - mean * mean, 0.0)
+        std = np.sqrt(var)
         
         # 计算偏度 (skewness)
         if std > 0:
-            skewness = np.mean(((flat - mean) / std) ** 3)
+            m3 = s3 / n - 3 * mean * s2 / n + 2 * mean ** 3
+            skewness = m3 / std ** 3
         else:
             skewness = 0.0
         
@@ -259,31 +324,31 @@ class AdvancedFeatureExtractor:
         Returns:
             DominantColor 列表
         """
-        pixels = lab.reshape(-1, 3).astype(np.float64)
+        pixels = lab.reshape(-1, 3)
+        
+        # 均匀采样部分像素，固定种子保证结果可复现
+        if len(pixels) > self.DOMINANT_SAMPLE_SIZE:
+            rng = np.random.default_rng(42)
+            pixels = pixels[rng.choice(len(pixels), self.DOMINANT_SAMPLE_SIZE, replace=False)]
+        pixels = pixels.astype(np.float32)
         
         # 使用 K-Means 聚类
-        centers, labels = _simple_kmeans(pixels, self.n_dominant_colors)
+        centers, labels = _kmeans(pixels, self.n_dominant_colors)
         
         # 计算每种颜色的占比
-        unique, counts = np.unique(labels, return_counts=True)
-        total_pixels = len(labels)
+        counts = np.bincount(labels, minlength=len(centers))
+        percentages = counts / len(labels) * 100
         
         dominant_colors = []
-        for i in range(len(centers)):
-            if i in unique:
-                idx = np.where(unique == i)[0][0]
-                percentage = (counts[idx] / total_pixels) * 100
-            else:
-                percentage = 0.0
-            
+        for center, percentage in zip(centers, percentages):
             # 转换回原始 LAB 范围
-            L = centers[i][0] * 100 / 255
-            a = centers[i][1] - 128
-            b = centers[i][2] - 128
+            L = center[0] * 100 / 255
+            a = center[1] - 128
+            b = center[2] - 128
             
             dominant_colors.append(DominantColor(
-                lab=(L, a, b),
-                percentage=round(percentage, 2)
+                lab=(float(L), float(a), float(b)),
+                percentage=round(float(percentage), 2)
             ))
         
         # 按占比降序排序
@@ -291,6 +356,67 @@ class AdvancedFeatureExtractor:
         
         return dominant_colors
     
+    def _load_rgb(self, image_path: str) -> np.ndarray:
+        """
+        读取图片并缩放到分析尺寸
+        
+        Args:
+            image_path: 图片文件路径
+            
+        Returns:
+            RGB图像数组 (H, W, 3)，uint8
+        """
+        with Image.open(image_path) as img:
+            # JPEG 在解码时直接按 1/2~1/8 缩小（不小于目标尺寸），其他格式无影响
+            img.draft('RGB', self.resize_size)
+            
+            # 转换为 RGB 模式
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            # 缩放图片
+            img_resized = img.resize(self.resize_size, Image.Resampling.LANCZOS)
+            return np.array(img_resized)
+    
+    def _features_from_color_spaces(self, hsv: np.ndarray, lab: np.ndarray,
+                                    image_path: str) -> ImageFeatures:
+        """
+        由 HSV 和 LAB 图像计算特征
+        
+        Args:
+            hsv: HSV图像数组 (H, W, 3)
+            lab: LAB图像数组 (H, W, 3)
+            image_path: 图片文件路径
+            
+        Returns:
+            ImageFeatures 对象
+        """
+        # 计算直方图
+        hue_hist = self._compute_histogram(hsv[:, :, 0], self.hue_bins)
+        lightness_hist = self._compute_histogram(lab[:, :, 0], self.lightness_bins)
+        saturation_hist = self._compute_histogram(hsv[:, :, 1], self.saturation_bins)
+        
+        # 计算统计信息
+        lightness_stats = self._compute_lightness_stats(lab[:, :, 0])
+        saturation_mean = float(np.mean(hsv[:, :, 1]))
+        
+        # 分类影调
+        tonal_class = self._classify_tonal_range(lightness_stats.mean)
+        
+        # 提取主色调
+        dominant_colors = self._extract_dominant_colors(lab)
+        
+        return ImageFeatures(
+            image_path=image_path,
+            hue_histogram=hue_hist,
+            lightness_histogram=lightness_hist,
+            saturation_histogram=saturation_hist,
+            dominant_colors=dominant_colors,
+            tonal_class=tonal_class,
+            lightness_stats=lightness_stats,
+            saturation_mean=saturation_mean
+        )
+    
     def extract_features(self, image_path: str) -> ImageFeatures:
         """
         提取图片的多维度特征
@@ -306,46 +432,81 @@ class AdvancedFeatureExtractor:
             ValueError: 图片无法处理
         """
         try:
-            with Image.open(image_path) as img:
-                # 转换为 RGB 模式
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 缩放图片
-                img_resized = img.resize(self.resize_size, Image.Resampling.LANCZOS)
-                rgb = np.array(img_resized)
-                
-                # 转换色彩空间
-                hsv = self._rgb_to_hsv(rgb)
-                lab = self._rgb_to_lab(rgb)
-                
-                # 计算直方图
-                hue_hist = self._compute_histogram(hsv[:, :, 0], self.hue_bins)
-                lightness_hist = self._compute_histogram(lab[:, :, 0], self.lightness_bins)
-                saturation_hist = self._compute_histogram(hsv[:, :, 1], self.saturation_bins)
-                
-                # 计算统计信息
-                lightness_stats = self._compute_lightness_stats(lab[:, :, 0])
-                saturation_mean = float(np.mean(hsv[:, :, 1]))
-                
-                # 分类影调
-                tonal_class = self._classify_tonal_range(lightness_stats.mean)
-                
-                # 提取主色调
-                dominant_colors = self._extract_dominant_colors(lab)
-                
-                return ImageFeatures(
-                    image_path=image_path,
-                    hue_histogram=hue_hist,
-                    lightness_histogram=lightness_hist,
-                    saturation_histogram=saturation_hist,
-                    dominant_colors=dominant_colors,
-                    tonal_class=tonal_class,
-                    lightness_stats=lightness_stats,
-                    saturation_mean=saturation_mean
-                )
+            rgb = self._load_rgb(image_path)
+            return self.extract_features_from_array(rgb, image_path)
                 
         except FileNotFoundError:
             raise FileNotFoundError(f"图片文件不存在: {image_path}")
         except Exception as e:
             raise ValueError(f"无法处理图片 {image_path}: {str(e)}")
+    
+    def extract_features_from_array(self, rgb: np.ndarray, image_path: str = "") -> ImageFeatures:
+        """
+        从已解码的图像数组提取特征，不再读取文件
+        
+        Args:
+            rgb: RGB图像数组 (H, W, 3)，uint8；尺寸与 resize_size 不同时先缩放
+            image_path: 写入结果的图片路径
+            
+        Returns:
+            ImageFeatures 对象
+        """
+        if (rgb.shape[1], rgb.shape[0]) != tuple(self.resize_size):
+            img = Image.fromarray(np.ascontiguousarray(rgb, dtype=np.uint8), 'RGB')
+            rgb = np.array(img.resize(self.resize_size, Image.Resampling.LANCZOS))
+        
+        # 转换色彩空间
+        hsv = self._rgb_to_hsv(rgb)
+        lab = self._rgb_to_lab(rgb)
+        
+        return self._features_from_color_spaces(hsv, lab, image_path)
+    
+    def extract_features_batch(self, image_paths: list[str]
+                               ) -> list[tuple[Optional[ImageFeatures], Optional[str]]]:
+        """
+        批量提取图片特征
+        
+        多线程解码后把整批图片拼接起来，色彩空间转换只做一次。
+        单张图片失败不影响其他图片。
+        
+        Args:
+            image_paths: 图片路径列表
+            
+        Returns:
+            与 image_paths 一一对应的 (特征, 错误信息) 列表，失败时特征为 None
+        """
+        def load(path: str) -> tuple[Optional[np.ndarray], Optional[str]]:
+            try:
+                return self._load_rgb(path), None
+            except FileNotFoundError:
+                return None, f"图片文件不存在: {path}"
+            except Exception as e:
+                return None, f"无法处理图片 {path}: {str(e)}"
+        
+        workers = min(self.DECODE_WORKERS, len(image_paths))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                loaded = list(executor.map(load, image_paths))
+        else:
+            loaded = [load(path) for path in image_paths]
+        
+        results = [(None, error) for _, error in loaded]
+        ok = [i for i, (rgb, _) in enumerate(loaded) if rgb is not None]
+        if not ok:
+            return results
+        
+        # 所有图片尺寸相同，纵向拼成一张 (B*H, W, 3) 的图统一转换
+        batch = np.stack([loaded[i][0] for i in ok])
+        n, h, w, _ = batch.shape
+        tall = batch.reshape(n * h, w, 3)
+        hsv = self._rgb_to_hsv(tall).reshape(n, h, w, 3)
+        lab = self._rgb_to_lab(tall).reshape(n, h, w, 3)
+        
+        for j, i in enumerate(ok):
+            path = image_paths[i]
+            try:
+                results[i] = (self._features_from_color_spaces(hsv[j], lab[j], path), None)
+            except Exception as e:
+                results[i] = (None, f"无法处理图片 {path}: {str(e)}")
+        
+        return results
@@ -4,6 +4,7 @@
 管理图片分类和文件操作，包括创建类别文件夹、移动图片等功能。
 """
 
+import errno
 import os
 import shutil
 import time
@@ -25,6 +26,10 @@ class CategoryManager:
         """
         self._base_path = Path(base_path)
         self._created_folders: list[str] = []
+        # 已确认存在的类别文件夹，避免每次移动都检查一次
+        self._known_folders: set[str] = set()
+        # 每个类别文件夹中已有的文件名，解决重名时不必逐个 stat
+        self._category_contents: dict[str, set[str]] = {}
     
     @property
     def base_path(self) -> Path:
@@ -57,6 +62,7 @@ class CategoryManager:
                 folder_path.mkdir(parents=True, exist_ok=True)
                 created.append(str(folder_path))
                 self._created_folders.append(str(folder_path))
+            self._known_folders.add(str(folder_path))
         
         return created
     
@@ -84,16 +90,29 @@ class CategoryManager:
         dest_folder = self._base_path / category
         
         # 确保目标文件夹存在
-        if not dest_folder.exists():
-            dest_folder.mkdir(parents=True, exist_ok=True)
-            self._created_folders.append(str(dest_folder))
+        folder_key = str(dest_folder)
+        if folder_key not in self._known_folders:
+            if not dest_folder.exists():
+                dest_folder.mkdir(parents=True, exist_ok=True)
+                self._created_folders.append(folder_key)
+            self._known_folders.add(folder_key)
         
         # 处理文件名冲突
+        taken = self._category_contents.get(folder_key)
+        if taken is None:
+            taken = set(os.listdir(folder_key))
+            self._category_contents[folder_key] = taken
         dest_path = dest_folder / source_path.name
-        dest_path = self._resolve_filename_conflict(dest_path)
+        dest_path = self._resolve_filename_conflict(dest_path, taken)
         
-        # 移动文件
-        shutil.move(str(source_path), str(dest_path))
+        # 移动文件：同一卷上直接重命名，跨卷时退回 shutil.move
+        try:
+            os.replace(str(source_path), str(dest_path))
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(source_path), str(dest_path))
+        taken.add(dest_path.name)
         
         # 创建移动记录
         record = MoveRecord(
@@ -116,16 +135,36 @@ class CategoryManager:
         """
         return str(self._base_path / category)
     
-    def _resolve_filename_conflict(self, dest_path: Path) -> Path:
+    def _resolve_filename_conflict(self, dest_path: Path,
+                                   taken: Optional[set[str]] = None) -> Path:
         """
         解决文件名冲突，如果目标文件已存在则添加数字后缀
         
         Args:
             dest_path: 原始目标路径
+            taken: 目标文件夹中已有的文件名集合，提供时在内存中查找，
+                仅对最终结果再确认一次磁盘（防止文件夹被外部修改）
             
         Returns:
             Path: 解决冲突后的目标路径
         """
+        if taken is not None:
+            stem = dest_path.stem
+            suffix = dest_path.suffix
+            parent = dest_path.parent
+            
+            name = dest_path.name
+            counter = 1
+            while name in taken:
+                name = f"{stem}_{counter}{suffix}"
+                counter += 1
+            
+            candidate = parent / name
+            if not candidate.exists():
+                return candidate
+            # 文件夹被外部修改过，重新读取后按磁盘状态处理
+            taken.update(os.listdir(parent))
+        
         if not dest_path.exists():
             return dest_path
         
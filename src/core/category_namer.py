@@ -5,7 +5,8 @@
 """
 
 import numpy as np
-from typing import Optional
+from collections import Counter
+from typing import Optional, Union
 
 from .models import (
     ImageFeatures,
@@ -15,6 +16,47 @@ from .models import (
 )
 
 
+def _build_hue_class_lut(*class_ranges: list[tuple[int, int]]) -> np.ndarray:
+    """
+    构建色调 bin 到色调类别的查找表
+    
+    Args:
+        class_ranges: 每个类别的 (起, 止) 闭区间列表，按类别编号顺序给出
+        
+    Returns:
+        长度 180 的类别编号数组，未覆盖的 bin 编号为 len(class_ranges)
+    """
+    lut = np.full(180, len(class_ranges), dtype=np.intp)
+    for class_id, ranges in enumerate(class_ranges):
+        for start, end in ranges:
+            lut[start:end + 1] = class_id
+    return lut
+
+
+# 聚类特征整理后的数组形式：(色调直方图 (N, bins), 平均饱和度 (N,), 影调列表)
+ClusterArrays = tuple[np.ndarray, np.ndarray, list[TonalClass]]
+
+
+def cluster_features_to_arrays(cluster_features: list[ImageFeatures]) -> ClusterArrays:
+    """
+    把一个聚类的特征一次性整理成数组，供多次命名复用
+    
+    Args:
+        cluster_features: 该聚类中所有图片的特征列表
+        
+    Returns:
+        (色调直方图 (N, bins), 平均饱和度 (N,), 影调列表)
+    """
+    if not cluster_features:
+        return np.zeros((0, 0)), np.zeros(0), []
+    
+    hue_histograms = np.stack([f.hue_histogram for f in cluster_features])
+    saturation_means = np.fromiter((f.saturation_mean for f in cluster_features),
+                                   dtype=np.float64, count=len(cluster_features))
+    tonal_classes = [f.tonal_class for f in cluster_features]
+    return hue_histograms, saturation_means, tonal_classes
+
+
 class CategoryNamer:
     """
     类别命名器
@@ -32,6 +74,9 @@ class CategoryNamer:
     COOL_HUE_RANGES = [(78, 160)]             # 青、蓝、紫
     NEUTRAL_HUE_RANGES = [(36, 77), (161, 169)]  # 绿、品红
     
+    # 每个色调 bin 所属类别：0 暖色、1 冷色、2 中性
+    _HUE_CLASS = _build_hue_class_lut(WARM_HUE_RANGES, COOL_HUE_RANGES, NEUTRAL_HUE_RANGES)
+    
     # 饱和度阈值
     VIVID_SATURATION_THRESHOLD = 150      # 高饱和度
     MODERATE_SATURATION_THRESHOLD = 80    # 中等饱和度
@@ -41,35 +86,26 @@ class CategoryNamer:
         """初始化类别命名器"""
         pass
     
-    def _analyze_dominant_hue(self, hue_histograms: list[np.ndarray]) -> HueCategory:
+    def _analyze_dominant_hue(self, hue_histograms: Union[list[np.ndarray], np.ndarray]) -> HueCategory:
         """
         分析主导色调
         
         Args:
-            hue_histograms: 色调直方图列表
+            hue_histograms: 色调直方图列表，或已堆叠的 (N, bins) 数组
             
         Returns:
             HueCategory 枚举值
         """
-        if not hue_histograms:
+        if len(hue_histograms) == 0:
             return HueCategory.NEUTRAL
         
         # 合并所有直方图
         combined = np.mean(hue_histograms, axis=0)
         
-        # 计算各色调范围的权重
-        warm_weight = 0.0
-        cool_weight = 0.0
-        neutral_weight = 0.0
-        
-        for start, end in self.WARM_HUE_RANGES:
-            warm_weight += np.sum(combined[start:end+1])
-        
-        for start, end in self.COOL_HUE_RANGES:
-            cool_weight += np.sum(combined[start:end+1])
-        
-        for start, end in self.NEUTRAL_HUE_RANGES:
-            neutral_weight += np.sum(combined[start:end+1])
+        # 计算各色调范围的权重：按类别查找表一次加权累加
+        n = min(len(combined), len(self._HUE_CLASS))
+        weights = np.bincount(self._HUE_CLASS[:n], weights=combined[:n], minlength=4)
+        warm_weight, cool_weight, neutral_weight = weights[:3]
         
         # 判断主导色调
         max_weight = max(warm_weight, cool_weight, neutral_weight)
@@ -84,17 +120,17 @@ class CategoryNamer:
         else:
             return HueCategory.NEUTRAL
     
-    def _analyze_saturation(self, saturation_means: list[float]) -> SaturationLevel:
+    def _analyze_saturation(self, saturation_means: Union[list[float], np.ndarray]) -> SaturationLevel:
         """
         分析饱和度水平
         
         Args:
-            saturation_means: 平均饱和度列表
+            saturation_means: 平均饱和度列表或数组
             
         Returns:
             SaturationLevel 枚举值
         """
-        if not saturation_means:
+        if len(saturation_means) == 0:
             return SaturationLevel.MODERATE
         
         avg_saturation = np.mean(saturation_means)
@@ -134,7 +170,7 @@ class CategoryNamer:
         # 返回最多的影调
         return max(counts, key=counts.get)
 
-    def generate_name(self, cluster_features: list[ImageFeatures]) -> str:
+    def generate_name(self, cluster_features: Union[list[ImageFeatures], ClusterArrays]) -> str:
         """
         根据聚类特征生成类别名称
         
@@ -142,50 +178,34 @@ class CategoryNamer:
         例如: "高调暖色鲜艳", "低调冷色柔和", "中调中性适中"
         
         Args:
-            cluster_features: 该聚类中所有图片的特征列表
+            cluster_features: 该聚类中所有图片的特征列表，
+                或 cluster_features_to_arrays 的返回值
             
         Returns:
             类别名称字符串
         """
-        if not cluster_features:
-            return "未分类"
-        
-        # 提取各维度特征
-        hue_histograms = [f.hue_histogram for f in cluster_features]
-        saturation_means = [f.saturation_mean for f in cluster_features]
-        tonal_classes = [f.tonal_class for f in cluster_features]
-        
-        # 分析各维度
-        tonal = self._analyze_tonal_class(tonal_classes)
-        hue = self._analyze_dominant_hue(hue_histograms)
-        saturation = self._analyze_saturation(saturation_means)
-        
-        # 组合名称
-        name_parts = [
-            tonal.value,      # 高调/中调/低调
-            hue.value,        # 暖色/冷色/中性
-            saturation.value  # 鲜艳/适中/柔和/中性
-        ]
-        
-        return "".join(name_parts)
+        return self.generate_name_with_details(cluster_features)[0]
     
-    def generate_name_with_details(self, cluster_features: list[ImageFeatures]) -> tuple[str, TonalClass, HueCategory, SaturationLevel]:
+    def generate_name_with_details(self, cluster_features: Union[list[ImageFeatures], ClusterArrays]
+                                   ) -> tuple[str, TonalClass, HueCategory, SaturationLevel]:
         """
         生成类别名称并返回详细分类信息
         
         Args:
-            cluster_features: 该聚类中所有图片的特征列表
+            cluster_features: 该聚类中所有图片的特征列表，
+                或 cluster_features_to_arrays 的返回值
             
         Returns:
             (名称, 影调, 色调, 饱和度)
         """
-        if not cluster_features:
-            return "未分类", TonalClass.MID_KEY, HueCategory.NEUTRAL, SaturationLevel.MODERATE
-        
         # 提取各维度特征
-        hue_histograms = [f.hue_histogram for f in cluster_features]
-        saturation_means = [f.saturation_mean for f in cluster_features]
-        tonal_classes = [f.tonal_class for f in cluster_features]
+        if isinstance(cluster_features, tuple):
+            hue_histograms, saturation_means, tonal_classes = cluster_features
+        else:
+            hue_histograms, saturation_means, tonal_classes = cluster_features_to_arrays(cluster_features)
+        
+        if not tonal_classes:
+            return "未分类", TonalClass.MID_KEY, HueCategory.NEUTRAL, SaturationLevel.MODERATE
         
         # 分析各维度
         tonal = self._analyze_tonal_class(tonal_classes)
@@ -197,46 +217,31 @@ class CategoryNamer:
         
         return name, tonal, hue, saturation
     
-    def generate_unique_names(self, all_cluster_features: list[list[ImageFeatures]]) -> list[str]:
+    def generate_unique_names(self,
+                              all_cluster_features: list[Union[list[ImageFeatures], ClusterArrays]]
+                              ) -> list[str]:
         """
         为多个聚类生成唯一的名称
         
         如果有重名，会添加序号区分
         
         Args:
-            all_cluster_features: 所有聚类的特征列表
+            all_cluster_features: 所有聚类的特征列表（或 cluster_features_to_arrays 的返回值）
             
         Returns:
             名称列表
         """
-        names = []
-        name_counts = {}
-        
-        for features in all_cluster_features:
-            base_name = self.generate_name(features)
-            
-            if base_name in name_counts:
-                name_counts[base_name] += 1
-                name = f"{base_name}_{name_counts[base_name]}"
-            else:
-                name_counts[base_name] = 1
-                name = base_name
-            
-            names.append(name)
+        base_names = [self.generate_name(features) for features in all_cluster_features]
+        base_counts = Counter(base_names)
         
-        # 如果第一个也有重名，添加序号
+        # 重名的类别从 _1 开始依次编号，不重名的保持原名
         final_names = []
-        seen = {}
-        for name in names:
-            base = name.split('_')[0] if '_' in name else name
-            if names.count(base) > 1 or any(n.startswith(base + '_') for n in names):
-                if base not in seen:
-                    seen[base] = 1
-                    final_names.append(f"{base}_1")
-                else:
-                    seen[base] += 1
-                    final_names.append(f"{base}_{seen[base]}")
+        seen: dict[str, int] = {}
+        for base in base_names:
+            if base_counts[base] > 1:
+                seen[base] = seen.get(base, 0) + 1
+                final_names.append(f"{base}_{seen[base]}")
             else:
-                final_names.append(name)
+                final_names.append(base)
         
         return final_names
@@ -4,8 +4,13 @@
 集成所有核心模块，协调整个图片颜色分类流程。
 """
 
+import hashlib
 import logging
 import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Callable, TYPE_CHECKING
 
@@ -38,6 +43,17 @@ class ClassificationEngine:
     提供统一的分类和回退接口。
     """
     
+    # 进度回调的最小时间间隔（秒），另外每 PROGRESS_EVERY 张图片至少通知一次
+    PROGRESS_INTERVAL = 0.05
+    PROGRESS_EVERY = 32
+    
+    # 颜色提取算法的版本号，提取结果有变化时递增，旧缓存随之失效
+    CACHE_VERSION = 7
+    # 磁盘缓存上限，超出后按写入时间删除最旧的条目
+    CACHE_MAX_BYTES = 64 * 1024 * 1024
+    # 残留临时文件（写入中途崩溃）超过该时长后清理
+    CACHE_TMP_MAX_AGE = 3600
+    
     def __init__(
         self,
         n_colors: int = 3,
@@ -56,6 +72,8 @@ class ClassificationEngine:
         self._category_manager: Optional[CategoryManager] = None
         self._progress_tracker: Optional[ProgressTracker] = None
         self._is_running = False
+        # 颜色提取结果的磁盘缓存目录，回退后重新分类时无需再次解码
+        self._feature_cache_dir = Path.home() / ".color_filter_cache"
     
     @property
     def scanner(self) -> ImageScanner:
@@ -154,42 +172,56 @@ class ClassificationEngine:
             result = ClassificationResult()
             
             # 步骤2 & 3: 处理每张图片
-            for idx, image_path in enumerate(scan_result.image_paths):
-                current_file = os.path.basename(image_path)
-                
-                # 更新进度
-                if progress_callback:
-                    progress_callback(idx, scan_result.total_count, current_file)
-                self._progress_tracker.update(idx, current_file)
+            # 颜色提取在线程池中并行执行，map 按原顺序返回结果，
+            # 移动文件和记录仍在当前线程中逐个完成
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                extractions = executor.map(self._extract_colors_safe, scan_result.image_paths)
+                last_progress = float("-inf")
                 
-                try:
-                    # 提取颜色
-                    extraction_result = self._extractor.extract_colors(image_path)
-                    category = extraction_result.dominant_category
-                    
-                    # 移动图片到对应类别文件夹
-                    move_record = self._category_manager.move_image(image_path, category)
-                    
-                    # 记录移动操作
-                    self._rollback_manager.record_move(move_record)
-                    result.move_records.append(move_record)
-                    
-                    # 更新类别计数
-                    if category not in result.category_counts:
-                        result.category_counts[category] = 0
-                    result.category_counts[category] += 1
+                for idx, (image_path, (extraction_result, error)) in enumerate(
+                    zip(scan_result.image_paths, extractions)
+                ):
+                    current_file = os.path.basename(image_path)
                     
-                    result.total_processed += 1
-                    logger.debug(f"已分类: {current_file} -> {category}")
+                    # 更新进度（节流，避免大量图片时频繁唤醒界面线程）
+                    now = time.monotonic()
+                    if idx % self.PROGRESS_EVERY == 0 or now - last_progress >= self.PROGRESS_INTERVAL:
+                        last_progress = now
+                        if progress_callback:
+                            progress_callback(idx, scan_result.total_count, current_file)
+                        self._progress_tracker.update(idx, current_file)
                     
-                except Exception as e:
-                    logger.warning(f"处理图片失败 {image_path}: {e}")
-                    result.total_failed += 1
+                    try:
+                        if error is not None:
+                            raise error
+                        category = extraction_result.dominant_category
+                        
+                        # 移动图片到对应类别文件夹
+                        move_record = self._category_manager.move_image(image_path, category)
+                        
+                        # 记录移动操作
+                        self._rollback_manager.record_move(move_record)
+                        result.move_records.append(move_record)
+                        
+                        # 更新类别计数
+                        if category not in result.category_counts:
+                            result.category_counts[category] = 0
+                        result.category_counts[category] += 1
+                        
+                        result.total_processed += 1
+                        logger.debug(f"已分类: {current_file} -> {category}")
+                        
+                    except Exception as e:
+                        logger.warning(f"处理图片失败 {image_path}: {e}")
+                        result.total_failed += 1
             
             # 记录创建的文件夹
             for folder in self._category_manager.created_folders:
                 self._rollback_manager.record_folder_creation(folder)
             
+            # 本次写入了新的缓存条目，控制缓存目录大小
+            self._prune_feature_cache()
+            
             # 完成进度
             if progress_callback:
                 progress_callback(
@@ -208,6 +240,125 @@ class ClassificationEngine:
         finally:
             self._is_running = False
     
+    def _feature_cache_path(self, image_path: str) -> Path:
+        """
+        计算图片对应的缓存文件路径
+        
+        缓存键包含缓存版本、路径、修改时间、文件大小和提取参数，
+        图片被修改、参数或提取算法变化后自然失效。
+        
+        Args:
+            image_path: 图片文件路径
+            
+        Returns:
+            缓存文件路径
+        """
+        stat = os.stat(image_path)
+        key = (
+            f"{self.CACHE_VERSION}|{os.path.abspath(image_path)}|{stat.st_mtime}|{stat.st_size}|"
+            f"{self._extractor.n_colors}|{self._extractor.resize_size}"
+        )
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return self._feature_cache_dir / f"{digest}.pkl"
+    
+    def _extract_colors_cached(self, image_path: str) -> ColorExtractionResult:
+        """
+        提取单张图片颜色，优先读取磁盘缓存
+        
+        缓存读写失败只影响性能，不影响结果。
+        
+        Args:
+            image_path: 图片文件路径
+            
+        Returns:
+            ColorExtractionResult: 颜色提取结果
+        """
+        try:
+            cache_path = self._feature_cache_path(image_path)
+        except OSError:
+            return self._extractor.extract_colors(image_path)
+        
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            pass
+        
+        result = self._extractor.extract_colors(image_path)
+        
+        # 先写临时文件再替换，避免其他进程读到不完整的缓存
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._feature_cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.debug(f"写入特征缓存失败 {image_path}: {e}")
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+        
+        return result
+    
+    def _prune_feature_cache(self) -> None:
+        """
+        限制磁盘缓存大小
+        
+        总大小超过 CACHE_MAX_BYTES 时按写入时间从旧到新删除缓存文件，
+        同时清理过期的残留临时文件。清理失败只影响磁盘占用。
+        """
+        entries = []
+        total = 0
+        now = time.time()
+        try:
+            with os.scandir(self._feature_cache_dir) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                        if entry.name.endswith(".tmp"):
+                            if now - stat.st_mtime > self.CACHE_TMP_MAX_AGE:
+                                os.unlink(entry.path)
+                            continue
+                        if entry.name.endswith(".pkl"):
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+                            total += stat.st_size
+                    except OSError:
+                        continue
+        except OSError:
+            return
+        
+        if total <= self.CACHE_MAX_BYTES:
+            return
+        
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.CACHE_MAX_BYTES:
+                break
+    
+    def _extract_colors_safe(
+        self, image_path: str
+    ) -> tuple[Optional[ColorExtractionResult], Optional[Exception]]:
+        """
+        提取单张图片颜色（在线程池中执行）
+        
+        Args:
+            image_path: 图片文件路径
+            
+        Returns:
+            (提取结果, 异常)，失败时提取结果为 None
+        """
+        try:
+            return self._extract_colors_cached(image_path), None
+        except Exception as e:
+            return None, e
+    
     def rollback(self) -> RollbackResult:
         """
         执行回退操作，将所有图片恢复到原始位置
@@ -4,7 +4,8 @@
 使用K-Means聚类算法提取图片主色调并进行颜色分类。
 """
 
-import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import numpy as np
@@ -13,6 +14,95 @@ from PIL import Image
 from .models import ColorCategory, ColorExtractionResult, ColorInfo
 
 
+# 有彩色按色相分段：_HUE_EDGES[i-1] <= h < _HUE_EDGES[i] 归为 _HUE_NAMES[i]
+_HUE_EDGES = np.array([15, 45, 70, 165, 195, 260, 330, 345], dtype=np.float32)
+_HUE_NAMES = np.array([
+    ColorCategory.RED.value,
+    ColorCategory.ORANGE.value,
+    ColorCategory.YELLOW.value,
+    ColorCategory.GREEN.value,
+    ColorCategory.CYAN.value,
+    ColorCategory.BLUE.value,
+    ColorCategory.PURPLE.value,
+    ColorCategory.PINK.value,
+    ColorCategory.RED.value,
+])
+
+
+def _kmeans_pp_init(pixels: np.ndarray, n_clusters: int, rng: np.random.RandomState) -> np.ndarray:
+    """
+    K-Means++ 初始化聚类中心
+    
+    第一个中心均匀随机选取，之后每个中心按到最近已选中心的距离平方加权抽样，
+    使初始中心分散开，减少Lloyd迭代次数。
+    
+    Args:
+        pixels: 像素数组 (N, 3)
+        n_clusters: 聚类数量
+        rng: 随机数生成器
+        
+    Returns:
+        np.ndarray: 初始聚类中心 (n_clusters, 3)
+    """
+    n_samples = len(pixels)
+    centers = np.empty((n_clusters, pixels.shape[1]), dtype=pixels.dtype)
+    centers[0] = pixels[rng.randint(n_samples)]
+    # 抽样概率用 float64 累加，避免 float32 像素下概率和偏离 1
+    min_dist = ((pixels - centers[0]) ** 2).sum(axis=1, dtype=np.float64)
+    
+    for i in range(1, n_clusters):
+        total = min_dist.sum()
+        if total > 0:
+            idx = rng.choice(n_samples, p=min_dist / total)
+        else:
+            # 所有像素都与已选中心重合（如纯色图），退化为均匀抽样
+            idx = rng.randint(n_samples)
+        centers[i] = pixels[idx]
+        np.minimum(min_dist, ((pixels - centers[i]) ** 2).sum(axis=1), out=min_dist)
+    
+    return centers
+
+
+# 三通道且聚类数不超过该值时按通道逐个中心计算距离，比矩阵乘法 + argmin 更快
+_RGB_KERNEL_MAX_CLUSTERS = 6
+
+
+def _assign_nearest_rgb(planes: np.ndarray, centers: np.ndarray,
+                        best: np.ndarray, dist: np.ndarray, tmp: np.ndarray) -> np.ndarray:
+    """
+    三通道像素的最近中心分配
+    
+    逐个中心按通道累加距离平方，用运行最小值更新标签，
+    全程只用长度为 N 的缓冲区，省去 (N, K) 距离矩阵上的 argmin。
+    
+    Args:
+        planes: 按通道存放的像素 (3, N)
+        centers: 聚类中心 (K, 3)
+        best: 当前最小距离缓冲区 (N,)
+        dist: 距离缓冲区 (N,)
+        tmp: 临时缓冲区 (N,)
+        
+    Returns:
+        np.ndarray: 每个像素的标签 (N,)，距离相同时取编号较小的中心
+    """
+    labels = np.zeros(planes.shape[1], dtype=np.intp)
+    for k, center in enumerate(centers):
+        np.subtract(planes[0], center[0], out=dist)
+        np.multiply(dist, dist, out=dist)
+        for ch in (1, 2):
+            np.subtract(planes[ch], center[ch], out=tmp)
+            np.multiply(tmp, tmp, out=tmp)
+            np.add(dist, tmp, out=dist)
+        
+        if k == 0:
+            best[:] = dist
+        else:
+            closer = dist < best
+            labels[closer] = k
+            np.minimum(best, dist, out=best)
+    return labels
+
+
 def _simple_kmeans(pixels: np.ndarray, n_clusters: int, max_iter: int = 100, random_state: int = 42) -> tuple[np.ndarray, np.ndarray]:
     """
     简单的K-Means实现，避免sklearn的threadpool依赖问题
@@ -26,57 +116,78 @@ def _simple_kmeans(pixels: np.ndarray, n_clusters: int, max_iter: int = 100, ran
     Returns:
         tuple: (聚类中心, 标签)
     """
-    np.random.seed(random_state)
+    # 使用独立的随机数生成器，多线程调用时互不干扰
+    rng = np.random.RandomState(random_state)
     n_samples = len(pixels)
     
-    # 随机初始化聚类中心
-    indices = np.random.choice(n_samples, n_clusters, replace=False)
-    centers = pixels[indices].astype(np.float64)
+    # 8 位像素用 float32 足够，矩阵乘法和累加的内存带宽减半
+    pixels = pixels.astype(np.float32, copy=False)
+    centers = _kmeans_pp_init(pixels, n_clusters, rng)
     
+    # 距离缓冲区在各次迭代间复用，原地计算避免每轮分配临时数组
+    rgb_kernel = pixels.shape[1] == 3 and n_clusters <= _RGB_KERNEL_MAX_CLUSTERS
+    if rgb_kernel:
+        channels = np.ascontiguousarray(pixels.T)
+        best, dist, tmp = (np.empty(n_samples, dtype=pixels.dtype) for _ in range(3))
+    else:
+        channels = pixels.T
+        distances = np.empty((n_samples, n_clusters), dtype=pixels.dtype)
+    
+    prev_labels = None
     for _ in range(max_iter):
-        # 计算每个像素到每个中心的距离
-        distances = np.zeros((n_samples, n_clusters))
-        for i in range(n_clusters):
-            distances[:, i] = np.sum((pixels - centers[i]) ** 2, axis=1)
-        
-        # 分配标签
-        labels = np.argmin(distances, axis=1)
+        # 计算每个像素到最近中心的距离并分配标签
+        if rgb_kernel:
+            labels = _assign_nearest_rgb(channels, centers, best, dist, tmp)
+        else:
+            # ||x - c||² = ||x||² - 2x·c + ||c||²，||x||² 对 argmin 无影响，可省略
+            np.matmul(pixels, centers.T, out=distances)
+            distances *= -2.0
+            distances += (centers * centers).sum(axis=1)
+            labels = np.argmin(distances, axis=1)
         
-        # 更新聚类中心
-        new_centers = np.zeros_like(centers)
-        for i in range(n_clusters):
-            mask = labels == i
-            if np.any(mask):
-                new_centers[i] = pixels[mask].mean(axis=0)
-            else:
-                new_centers[i] = centers[i]
-        
-        # 检查收敛
-        if np.allclose(centers, new_centers):
+        # 标签不再变化即已收敛，中心也不会再变
+        if prev_labels is not None and np.array_equal(labels, prev_labels):
             break
-        centers = new_centers
+        prev_labels = labels
+        
+        # 更新聚类中心：按标签累加各通道求均值，空簇保留原中心
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack([np.bincount(labels, weights=channel, minlength=n_clusters)
+                         for channel in channels], axis=1)
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
     
     return centers, labels
 
 
+def _rgb_to_hsv(colors: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量RGB转HSV（max/min 公式）
+    
+    Args:
+        colors: RGB颜色数组 (K, 3)，取值 0-255
+        
+    Returns:
+        tuple: (色相 0-360, 饱和度 0-1, 明度 0-255)
+    """
+    colors = colors.astype(np.float32)
+    r, g, b = colors[:, 0], colors[:, 1], colors[:, 2]
+    v = colors.max(axis=1)
+    delta = v - colors.min(axis=1)
+    
+    s = np.divide(delta, v, out=np.zeros_like(v), where=v > 0)
+    safe_delta = np.where(delta > 0, delta, 1.0)
+    h = np.where(v == r, ((g - b) / safe_delta) % 6,
+                 np.where(v == g, (b - r) / safe_delta + 2, (r - g) / safe_delta + 4)) * 60
+    h = np.where(delta > 0, h, 0.0)
+    return h, s, v
+
+
 class ColorExtractor:
     """使用K-Means算法提取图片主色调"""
     
-    # 预定义颜色类别及其RGB参考值
-    COLOR_CATEGORIES: dict[str, tuple[int, int, int]] = {
-        ColorCategory.RED.value: (255, 0, 0),
-        ColorCategory.ORANGE.value: (255, 165, 0),
-        ColorCategory.YELLOW.value: (255, 255, 0),
-        ColorCategory.GREEN.value: (0, 128, 0),
-        ColorCategory.CYAN.value: (0, 255, 255),
-        ColorCategory.BLUE.value: (0, 0, 255),
-        ColorCategory.PURPLE.value: (128, 0, 128),
-        ColorCategory.PINK.value: (255, 192, 203),
-        ColorCategory.BROWN.value: (139, 69, 19),
-        ColorCategory.BLACK.value: (0, 0, 0),
-        ColorCategory.WHITE.value: (255, 255, 255),
-        ColorCategory.GRAY.value: (128, 128, 128),
-    }
+    # 聚类前最多采样的像素数，主色中心在数千个样本时已经稳定
+    MAX_SAMPLES = 4096
 
     def __init__(self, n_colors: int = 3, resize_size: tuple[int, int] = (150, 150)):
         """
@@ -106,60 +217,52 @@ class ColorExtractor:
         try:
             # 打开并处理图片
             with Image.open(image_path) as img:
+                # JPEG 在解码时直接按 1/2~1/8 缩小（保留两倍目标尺寸供后续重采样）
+                img.draft('RGB', (self.resize_size[0] * 2, self.resize_size[1] * 2))
+                
                 # 转换为RGB模式（处理RGBA、P等模式）
                 if img.mode != 'RGB':
                     img = img.convert('RGB')
                 
-                # 缩放图片以提高性能
-                img_resized = img.resize(self.resize_size, Image.Resampling.LANCZOS)
+                # 缩放图片以提高性能；聚类只需要颜色分布，双线性足够
+                img.thumbnail(self.resize_size, Image.Resampling.BILINEAR)
                 
                 # 转换为numpy数组
-                pixels = np.array(img_resized)
+                pixels = np.array(img)
                 pixels = pixels.reshape(-1, 3)
+                if len(pixels) > self.MAX_SAMPLES:
+                    rng = np.random.default_rng(42)
+                    pixels = pixels[rng.choice(len(pixels), self.MAX_SAMPLES, replace=False)]
+                pixels = pixels.astype(np.float32, copy=False)
                 
                 # 使用简单K-Means聚类提取主色
                 centers, labels = _simple_kmeans(pixels, self.n_colors)
                 
-                # 计算每种颜色的占比
-                unique, counts = np.unique(labels, return_counts=True)
-                total_pixels = len(labels)
-                
-                # 构建颜色信息列表
-                colors: list[ColorInfo] = []
-                raw_percentages: list[float] = []
-                
-                for cluster_idx in range(self.n_colors):
-                    rgb = tuple(int(c) for c in centers[cluster_idx])
-                    
-                    # 计算该颜色的占比
-                    if cluster_idx in unique:
-                        idx = np.where(unique == cluster_idx)[0][0]
-                        percentage = (counts[idx] / total_pixels) * 100
-                    else:
-                        percentage = 0.0
-                    
-                    category = self.classify_color(rgb)
-                    raw_percentages.append(percentage)
-                    colors.append(ColorInfo(
-                        rgb=rgb,
-                        percentage=round(percentage, 2),
-                        category=category
-                    ))
+                # 计算每种颜色的占比（保留两位小数）
+                counts = np.bincount(labels, minlength=self.n_colors)
+                percentages = np.round(counts / len(labels) * 100, 2)
                 
                 # 确保百分比总和为100%（修正四舍五入误差）
-                total_rounded = sum(c.percentage for c in colors)
-                if abs(total_rounded - 100.0) > 0.001 and colors:
+                total_rounded = percentages.sum()
+                if abs(total_rounded - 100.0) > 0.001 and len(percentages):
                     # 找到占比最大的颜色，调整其百分比以确保总和为100%
                     diff = round(100.0 - total_rounded, 2)
-                    max_idx = max(range(len(colors)), key=lambda i: colors[i].percentage)
-                    colors[max_idx] = ColorInfo(
-                        rgb=colors[max_idx].rgb,
-                        percentage=round(colors[max_idx].percentage + diff, 2),
-                        category=colors[max_idx].category
-                    )
+                    max_idx = int(np.argmax(percentages))
+                    percentages[max_idx] = round(percentages[max_idx] + diff, 2)
+                
+                rgbs = [tuple(int(c) for c in centers[cluster_idx]) for cluster_idx in range(self.n_colors)]
+                categories = self.classify_colors_batch(np.array(rgbs))
                 
-                # 按占比降序排序
-                colors.sort(key=lambda c: c.percentage, reverse=True)
+                # 按占比降序构建颜色信息列表（占比相同时保持聚类顺序）
+                order = np.argsort(-percentages, kind='stable')
+                colors: list[ColorInfo] = [
+                    ColorInfo(
+                        rgb=rgbs[cluster_idx],
+                        percentage=percentages[cluster_idx],
+                        category=categories[cluster_idx]
+                    )
+                    for cluster_idx in order
+                ]
                 
                 # 获取主要颜色类别
                 dominant_category = self.get_dominant_category_from_colors(colors)
@@ -175,11 +278,33 @@ class ColorExtractor:
         except Exception as e:
             raise ValueError(f"无法处理图片 {image_path}: {str(e)}")
     
+    def extract_colors_batch(self, image_paths: list[str]) -> list[ColorExtractionResult]:
+        """
+        多线程批量提取图片主要颜色
+        
+        PIL 解码缩放和 NumPy 聚类都会释放 GIL，线程即可并行。
+        
+        Args:
+            image_paths: 图片文件路径列表
+            
+        Returns:
+            list[ColorExtractionResult]: 与 image_paths 一一对应的提取结果
+            
+        Raises:
+            FileNotFoundError: 图片文件不存在
+            ValueError: 图片无法处理
+        """
+        workers = min(os.cpu_count() or 1, len(image_paths))
+        if workers <= 1:
+            return [self.extract_colors(path) for path in image_paths]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.extract_colors, image_paths))
+    
     def classify_color(self, rgb: tuple[int, int, int]) -> str:
         """
         将RGB颜色映射到预定义类别
         
-        使用欧氏距离找到最接近的预定义颜色类别。
+        在HSV空间中按明度、饱和度和色相分段判断类别。
         
         Args:
             rgb: RGB颜色值元组
@@ -187,33 +312,52 @@ class ColorExtractor:
         Returns:
             str: 颜色类别名称
         """
-        min_distance = float('inf')
-        closest_category = ColorCategory.OTHER.value
+        return self.classify_colors_batch(np.array([rgb]))[0]
+    
+    def classify_colors_batch(self, colors: np.ndarray) -> list[str]:
+        """
+        批量将RGB颜色映射到预定义类别
+        
+        灰度色（R≈G≈B）按亮度归为黑/白/灰；其余颜色转到HSV空间，
+        过暗归为黑色，低饱和归为白/灰，偏暗的暖色归为棕色，
+        浅红归为粉色，其余按色相分段。
+        
+        Args:
+            colors: RGB颜色数组 (K, 3)
+            
+        Returns:
+            list[str]: 每个颜色的类别名称
+        """
+        colors = np.asarray(colors, dtype=np.int32).reshape(-1, 3)
+        if len(colors) == 0:
+            return []
         
-        r, g, b = rgb
+        grayscale = self._is_grayscale_batch(colors)
+        brightness = colors.sum(axis=1) / 3
         
-        # 特殊处理：检查是否为灰度色（R≈G≈B）
-        if self._is_grayscale(rgb):
-            brightness = (r + g + b) / 3
-            if brightness < 50:
-                return ColorCategory.BLACK.value
-            elif brightness > 200:
-                return ColorCategory.WHITE.value
-            else:
-                return ColorCategory.GRAY.value
+        h, s, v = _rgb_to_hsv(colors)
+        s255 = s * 255
+        warm = (h < 45) | (h >= 345)
+        reddish = (h < 15) | (h >= 330)
         
-        # 计算与每个预定义颜色的欧氏距离
-        for category_name, ref_rgb in self.COLOR_CATEGORIES.items():
-            # 跳过黑白灰，因为已经在上面处理过了
-            if category_name in [ColorCategory.BLACK.value, ColorCategory.WHITE.value, ColorCategory.GRAY.value]:
-                continue
-                
-            distance = self._euclidean_distance(rgb, ref_rgb)
-            if distance < min_distance:
-                min_distance = distance
-                closest_category = category_name
+        black = ColorCategory.BLACK.value
+        white = ColorCategory.WHITE.value
+        gray = ColorCategory.GRAY.value
+        conditions = [
+            grayscale & (brightness < 50),
+            grayscale & (brightness > 200),
+            grayscale,
+            v < 50,
+            (s255 < 20) & (v > 200),
+            s255 < 25,
+            warm & (v < 160),
+            reddish & (s < 0.5) & (v >= 180),
+        ]
+        choices = [black, white, gray, black, white, gray,
+                   ColorCategory.BROWN.value, ColorCategory.PINK.value]
         
-        return closest_category
+        hue_names = _HUE_NAMES[np.searchsorted(_HUE_EDGES, h, side='right')]
+        return np.select(conditions, choices, default=hue_names).tolist()
     
     def get_dominant_category(self, result: ColorExtractionResult) -> str:
         """
@@ -244,35 +388,29 @@ class ColorExtractor:
         # 颜色列表已按占比降序排序
         return colors[0].category
     
-    def _euclidean_distance(self, rgb1: tuple[int, int, int], rgb2: tuple[int, int, int]) -> float:
+    def _is_grayscale(self, rgb: tuple[int, int, int], threshold: int = 20) -> bool:
         """
-        计算两个RGB颜色之间的欧氏距离
+        检查颜色是否为灰度色
         
         Args:
-            rgb1: 第一个RGB颜色
-            rgb2: 第二个RGB颜色
+            rgb: RGB颜色值
+            threshold: 判断阈值，R、G、B之间的最大差值
             
         Returns:
-            float: 欧氏距离
+            bool: 是否为灰度色
         """
-        return math.sqrt(
-            (rgb1[0] - rgb2[0]) ** 2 +
-            (rgb1[1] - rgb2[1]) ** 2 +
-            (rgb1[2] - rgb2[2]) ** 2
-        )
+        # 三个通道两两差值都不超过阈值，等价于最大值与最小值之差不超过阈值
+        return max(rgb) - min(rgb) <= threshold
     
-    def _is_grayscale(self, rgb: tuple[int, int, int], threshold: int = 20) -> bool:
+    def _is_grayscale_batch(self, colors: np.ndarray, threshold: int = 20) -> np.ndarray:
         """
-        检查颜色是否为灰度色
+        批量检查颜色是否为灰度色
         
         Args:
-            rgb: RGB颜色值
+            colors: RGB颜色数组 (K, 3)
             threshold: 判断阈值，R、G、B之间的最大差值
             
         Returns:
-            bool: 是否为灰度色
+            np.ndarray: 灰度色布尔掩码 (K,)
         """
-        r, g, b = rgb
-        return (abs(r - g) <= threshold and 
-                abs(g - b) <= threshold and 
-                abs(r - b) <= threshold)
+        return np.ptp(colors, axis=1) <= threshold
@@ -5,11 +5,62 @@
 """
 
 import numpy as np
+from functools import lru_cache
 from typing import Optional
 
+from .advanced_extractor import AdvancedFeatureExtractor
 from .models import TonalClass, LightnessStats
 
 
+@lru_cache(maxsize=None)
+def _bin_centers(bins: int) -> np.ndarray:
+    """
+    各直方图区间的中心明度值（只读，按区间数缓存）
+    
+    Args:
+        bins: 直方图区间数
+        
+    Returns:
+        区间中心数组 (bins,)
+    """
+    centers = np.arange(bins) * (256 / bins) + (256 / bins / 2)
+    centers.flags.writeable = False
+    return centers
+
+
+@lru_cache(maxsize=None)
+def _bin_values(bins: int) -> np.ndarray:
+    """
+    各直方图区间的起始明度值（只读，按区间数缓存）
+    
+    Args:
+        bins: 直方图区间数
+        
+    Returns:
+        区间起始值数组 (bins,)
+    """
+    values = np.arange(bins) * (256 / bins)
+    values.flags.writeable = False
+    return values
+
+
+@lru_cache(maxsize=None)
+def _bin_center_powers(bins: int) -> np.ndarray:
+    """
+    区间中心的一、二、三次幂，用于一次求出各阶原点矩（只读，按区间数缓存）
+    
+    Args:
+        bins: 直方图区间数
+        
+    Returns:
+        幂次矩阵 (bins, 3)
+    """
+    centers = _bin_centers(bins)
+    powers = np.stack([centers, centers ** 2, centers ** 3], axis=1)
+    powers.flags.writeable = False
+    return powers
+
+
 class HistogramAnalyzer:
     """
     直方图分析器
@@ -30,6 +81,29 @@ class HistogramAnalyzer:
         self.high_key_threshold = high_key_threshold
         self.low_key_threshold = low_key_threshold
     
+    @classmethod
+    def compute_from_rgb(cls, img: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        从RGB图像一次计算色调、饱和度和明度直方图
+        
+        复用特征提取器的 HSV 转换，结果与特征直方图的取值完全一致；
+        三个直方图都从同一份HSV数据上用 bincount 统计。
+        
+        Args:
+            img: RGB图像数组 (H, W, 3)，uint8
+            
+        Returns:
+            (色调直方图 (180,), 饱和度直方图 (256,), 明度直方图 (256,))，均归一化
+        """
+        hsv = AdvancedFeatureExtractor()._rgb_to_hsv(np.asarray(img))
+        h, s, v = hsv.reshape(-1, 3).T
+        
+        n = max(len(h), 1)
+        hue_hist = np.bincount(h, minlength=180)[:180] / n
+        saturation_hist = np.bincount(s, minlength=256) / n
+        value_hist = np.bincount(v, minlength=256) / n
+        return hue_hist, saturation_hist, value_hist
+    
     def classify_tonal_range(self, lightness_hist: np.ndarray) -> TonalClass:
         """
         根据明度直方图分类影调
@@ -41,10 +115,19 @@ class HistogramAnalyzer:
             TonalClass 枚举值
         """
         # 计算加权平均明度
-        bins = len(lightness_hist)
-        bin_centers = np.arange(bins) * (256 / bins) + (256 / bins / 2)
-        mean_lightness = np.sum(lightness_hist * bin_centers)
+        mean_lightness = np.dot(lightness_hist, _bin_centers(len(lightness_hist)))
+        return self._tonal_class_from_mean(mean_lightness)
+    
+    def _tonal_class_from_mean(self, mean_lightness: float) -> TonalClass:
+        """
+        根据平均明度判定影调
         
+        Args:
+            mean_lightness: 加权平均明度
+            
+        Returns:
+            TonalClass 枚举值
+        """
         if mean_lightness > self.high_key_threshold:
             return TonalClass.HIGH_KEY
         elif mean_lightness < self.low_key_threshold:
@@ -62,19 +145,22 @@ class HistogramAnalyzer:
         Returns:
             LightnessStats 对象
         """
-        bins = len(lightness_hist)
-        bin_centers = np.arange(bins) * (256 / bins) + (256 / bins / 2)
+        # 一次矩阵乘法得到一、二、三阶原点矩
+        powers = _bin_center_powers(len(lightness_hist))
+        m1, m2, m3 = np.asarray(lightness_hist, dtype=np.float64) @ powers
         
         # 加权平均
-        mean = np.sum(lightness_hist * bin_centers)
+        mean = m1
         
-        # 加权标准差
-        variance = np.sum(lightness_hist * (bin_centers - mean) ** 2)
+        # 加权标准差：Var = E[x²] - E[x]²，相减的舍入误差视为 0
+        variance = m2 - m1 * m1
+        if variance <= 1e-12 * m2:
+            variance = 0.0
         std = np.sqrt(variance)
         
-        # 加权偏度
+        # 加权偏度：E[(x-μ)³] = E[x³] - 3μσ² - μ³
         if std > 0:
-            skewness = np.sum(lightness_hist * ((bin_centers - mean) / std) ** 3)
+            skewness = (m3 - 3 * m1 * variance - m1 ** 3) / std ** 3
         else:
             skewness = 0.0
         
@@ -109,15 +195,48 @@ class HistogramAnalyzer:
         """
         # 计算累积分布
         cdf = np.cumsum(lightness_hist)
+        return self._dynamic_range_from_cdf(cdf, percentile_low, percentile_high)
+    
+    def compute_all_stats(self, lightness_hist: np.ndarray
+                          ) -> tuple[TonalClass, LightnessStats, float]:
+        """
+        一次计算影调分类、明度统计量和动态范围
         
-        bins = len(lightness_hist)
-        bin_values = np.arange(bins) * (256 / bins)
+        各项共用同一组原点矩和累积分布，对比度即 LightnessStats.std。
+        
+        Args:
+            lightness_hist: 归一化的明度直方图
+            
+        Returns:
+            (影调分类, 明度统计量, 动态范围)
+        """
+        stats = self.compute_lightness_stats(lightness_hist)
+        tonal_class = self._tonal_class_from_mean(stats.mean)
+        dynamic_range = self._dynamic_range_from_cdf(np.cumsum(lightness_hist))
+        return tonal_class, stats, dynamic_range
+    
+    def _dynamic_range_from_cdf(self, cdf: np.ndarray,
+                                percentile_low: float = 5,
+                                percentile_high: float = 95) -> float:
+        """
+        从累积分布计算动态范围
         
-        # 找到百分位对应的明度值
-        low_idx = np.searchsorted(cdf, percentile_low / 100)
-        high_idx = np.searchsorted(cdf, percentile_high / 100)
+        Args:
+            cdf: 明度直方图的累积分布
+            percentile_low: 低百分位
+            percentile_high: 高百分位
+            
+        Returns:
+            动态范围值
+        """
+        bin_values = _bin_values(len(cdf))
         
-        low_value = bin_values[min(low_idx, bins - 1)]
-        high_value = bin_values[min(high_idx, bins - 1)]
+        # 找到百分位对应的明度值：第一个达到百分位的区间，
+        # 舍入误差导致累积分布达不到百分位时取最后一个区间
+        last = len(cdf) - 1
+        low_reached = cdf >= percentile_low / 100
+        high_reached = cdf >= percentile_high / 100
+        low_idx = np.argmax(low_reached) if low_reached[last] else last
+        high_idx = np.argmax(high_reached) if high_reached[last] else last
         
-        return high_value - low_value
+        return bin_values[high_idx] - bin_values[low_idx]
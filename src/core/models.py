@@ -142,6 +142,8 @@ class ImageFeatures:
     # 统计信息
     lightness_stats: LightnessStats
     saturation_mean: float              # 平均饱和度 (0-255)
+    # 由直方图派生、供相似度计算复用的缓存（如 sqrt 直方图），首次使用时填充
+    _derived: dict = field(default_factory=dict, init=False, repr=False, compare=False)
 
 
 @dataclass
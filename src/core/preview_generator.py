@@ -1,6 +1,8 @@
 """Preview generation module for image thumbnails."""
 
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -15,10 +17,12 @@ class PreviewGenerator:
     Attributes:
         THUMBNAIL_SIZE: Default thumbnail dimensions
         MAX_PREVIEW_COUNT: Maximum number of previews per category
+        CACHE_SIZE: Maximum number of cached thumbnails
     """
     
     THUMBNAIL_SIZE: tuple[int, int] = (100, 100)
     MAX_PREVIEW_COUNT: int = 6
+    CACHE_SIZE: int = 512
     
     # Supported image formats
     SUPPORTED_FORMATS: tuple[str, ...] = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
@@ -30,6 +34,8 @@ class PreviewGenerator:
             thumbnail_size: Optional custom thumbnail size (width, height)
         """
         self._thumbnail_size = thumbnail_size or self.THUMBNAIL_SIZE
+        # LRU cache: (path, mtime, size) -> QPixmap; a changed file gets a new key
+        self._cache: OrderedDict[tuple[str, float, tuple[int, int]], QPixmap] = OrderedDict()
     
     def generate_thumbnail(self, image_path: str) -> Optional[QPixmap]:
         """生成单张图片的缩略图
@@ -40,20 +46,68 @@ class PreviewGenerator:
         Returns:
             QPixmap: 缩略图对象，如果生成失败则返回None
         """
+        key = self._cache_key(image_path)
+        pixmap = self._cache_get(key)
+        if pixmap is not None:
+            return pixmap
+        
+        img = self._load_thumbnail(image_path)
+        if img is None:
+            return None
+        return self._cache_put(key, self._pil_to_qpixmap(img))
+    
+    def _cache_key(self, image_path: str) -> Optional[tuple[str, float, tuple[int, int]]]:
+        """缩略图缓存键，文件不可访问时返回None（不缓存）"""
+        try:
+            return (image_path, os.path.getmtime(image_path), self._thumbnail_size)
+        except OSError:
+            return None
+    
+    def _cache_get(self, key: Optional[tuple[str, float, tuple[int, int]]]) -> Optional[QPixmap]:
+        """查找缓存的缩略图并标记为最近使用"""
+        if key is None:
+            return None
+        pixmap = self._cache.get(key)
+        if pixmap is not None:
+            self._cache.move_to_end(key)
+        return pixmap
+    
+    def _cache_put(self, key: Optional[tuple[str, float, tuple[int, int]]], pixmap: QPixmap) -> QPixmap:
+        """缓存缩略图，超出容量时淘汰最久未使用的条目"""
+        if key is not None:
+            self._cache[key] = pixmap
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return pixmap
+    
+    def _load_thumbnail(self, image_path: str) -> Optional[Image.Image]:
+        """读取图片并缩放为RGB缩略图（仅使用PIL，可在工作线程中调用）
+        
+        Args:
+            image_path: 图片文件路径
+            
+        Returns:
+            Image.Image: RGB缩略图，如果读取失败则返回None
+        """
         try:
             # Open and resize image using PIL
             with Image.open(image_path) as img:
-                # Convert to RGB if necessary (handles RGBA, P mode, etc.)
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                elif img.mode != 'RGB':
+                # Let JPEG decode at a reduced scale (no effect on other formats)
+                img.draft('RGB', (self._thumbnail_size[0] * 2, self._thumbnail_size[1] * 2))
+                
+                # Alpha and palette images are converted before resizing: resampling
+                # RGBA premultiplies alpha and P needs a palette lookup, both slower
+                # than one RGB conversion. Other modes (L, CMYK, ...) are resized
+                # first so only the small thumbnail gets converted.
+                if img.mode in ('RGBA', 'LA', 'P', 'PA'):
                     img = img.convert('RGB')
                 
                 # Create thumbnail maintaining aspect ratio
-                img.thumbnail(self._thumbnail_size, Image.Resampling.LANCZOS)
+                img.thumbnail(self._thumbnail_size, Image.Resampling.BILINEAR)
                 
-                # Convert PIL Image to QPixmap
-                return self._pil_to_qpixmap(img)
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                return img
                 
         except Exception:
             return None
@@ -75,11 +129,26 @@ class PreviewGenerator:
         # Get all image files in the category folder
         image_files = self._get_image_files(category_path)
         
-        # Generate thumbnails for up to MAX_PREVIEW_COUNT images
-        for image_path in image_files[:self.MAX_PREVIEW_COUNT]:
-            thumbnail = self.generate_thumbnail(image_path)
-            if thumbnail is not None:
-                thumbnails.append(thumbnail)
+        # Decode up to MAX_PREVIEW_COUNT images in parallel; QPixmap must be
+        # created on the calling (GUI) thread, so only the PIL work is threaded
+        preview_files = image_files[:self.MAX_PREVIEW_COUNT]
+        keys = [self._cache_key(path) for path in preview_files]
+        cached = [self._cache_get(key) for key in keys]
+        missing = [path for path, pixmap in zip(preview_files, cached) if pixmap is None]
+        
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                loaded = dict(zip(missing, executor.map(self._load_thumbnail, missing)))
+        else:
+            loaded = {path: self._load_thumbnail(path) for path in missing}
+        
+        for path, key, pixmap in zip(preview_files, keys, cached):
+            if pixmap is None:
+                img = loaded[path]
+                if img is None:
+                    continue
+                pixmap = self._cache_put(key, self._pil_to_qpixmap(img))
+            thumbnails.append(pixmap)
         
         return thumbnails
     
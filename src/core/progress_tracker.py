@@ -1,5 +1,7 @@
 """Progress tracking module for image classification operations."""
 
+import time
+
 from PyQt6.QtCore import QObject, pyqtSignal
 
 
@@ -9,12 +11,16 @@ class ProgressTracker(QObject):
     Attributes:
         progress_updated: Signal emitted when progress changes (current, total, current_file)
         completed: Signal emitted when all tasks are complete
+        EMIT_INTERVAL: Minimum seconds between progress_updated emissions
     """
     
     # Qt signals
     progress_updated = pyqtSignal(int, int, str)  # current, total, current_file
     completed = pyqtSignal()
     
+    # At most ~60 progress signals per second; the final update always emits
+    EMIT_INTERVAL: float = 1 / 60
+    
     def __init__(self, total: int):
         """初始化进度追踪器
         
@@ -25,6 +31,7 @@ class ProgressTracker(QObject):
         self._total = total
         self._current = 0
         self._current_file = ""
+        self._last_emit_time = float("-inf")
     
     @property
     def total(self) -> int:
@@ -45,10 +52,16 @@ class ProgressTracker(QObject):
         """
         self._current = current
         self._current_file = current_file
-        self.progress_updated.emit(current, self._total, current_file)
+        
+        # Throttle signal emission so fast loops don't flood the GUI thread
+        finished = current >= self._total
+        now = time.monotonic()
+        if finished or now - self._last_emit_time >= self.EMIT_INTERVAL:
+            self._last_emit_time = now
+            self.progress_updated.emit(current, self._total, current_file)
         
         # Check if completed
-        if current >= self._total:
+        if finished:
             self.completed.emit()
     
     def get_percentage(self) -> float:
@@ -70,3 +83,4 @@ class ProgressTracker(QObject):
         self._total = total
         self._current = 0
         self._current_file = ""
+        self._last_emit_time = float("-inf")
@@ -4,11 +4,14 @@
 管理操作历史和回退功能，支持将分类后的图片恢复到原始位置。
 """
 
+import errno
 import os
 import shutil
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
+
 from .models import MoveRecord, RollbackResult
 
 
@@ -17,13 +20,19 @@ class RollbackManager:
     
     def __init__(self):
         """初始化回退管理器"""
-        self._records: list[MoveRecord] = []
+        # 移动记录按字段分列存储，回退时时间戳可直接用 NumPy 排序
+        self._sources: list[str] = []
+        self._dests: list[str] = []
+        self._timestamps: list[float] = []
         self._created_folders: list[str] = []
     
     @property
     def records(self) -> list[MoveRecord]:
         """获取移动记录列表的副本"""
-        return self._records.copy()
+        return [
+            MoveRecord(source_path=source, destination_path=dest, timestamp=timestamp)
+            for source, dest, timestamp in zip(self._sources, self._dests, self._timestamps)
+        ]
     
     @property
     def created_folders(self) -> list[str]:
@@ -37,7 +46,9 @@ class RollbackManager:
         Args:
             record: 移动操作记录
         """
-        self._records.append(record)
+        self._sources.append(record.source_path)
+        self._dests.append(record.destination_path)
+        self._timestamps.append(record.timestamp)
     
     def record_folder_creation(self, folder_path: str) -> None:
         """
@@ -59,19 +70,21 @@ class RollbackManager:
         """
         result = RollbackResult()
         
-        # 按时间戳逆序回退（后移动的先恢复）
-        sorted_records = sorted(self._records, key=lambda r: r.timestamp, reverse=True)
+        # 按时间戳逆序回退（后移动的先恢复），时间戳相同时保持记录顺序
+        order = np.argsort(-np.asarray(self._timestamps, dtype=np.float64), kind='stable')
         
-        for record in sorted_records:
+        for i in order:
+            record_source = self._sources[i]
+            record_dest = self._dests[i]
             try:
-                dest_path = Path(record.destination_path)
-                source_path = Path(record.source_path)
+                dest_path = Path(record_dest)
+                source_path = Path(record_source)
                 
                 # 检查目标文件是否存在（即当前位置的文件）
                 if not dest_path.exists():
                     # 文件已被删除或移动，记录失败
                     result.failed_count += 1
-                    result.failed_files.append(record.destination_path)
+                    result.failed_files.append(record_dest)
                     continue
                 
                 # 确保原始位置的父目录存在
@@ -83,20 +96,25 @@ class RollbackManager:
                 if source_path.exists():
                     # 原始位置已有文件，跳过并记录失败
                     result.failed_count += 1
-                    result.failed_files.append(record.source_path)
+                    result.failed_files.append(record_source)
                     continue
                 
-                # 移动文件回原始位置
-                shutil.move(str(dest_path), str(source_path))
+                # 移动文件回原始位置：同一卷上一次重命名即可，跨卷时退回复制+删除
+                try:
+                    os.rename(dest_path, source_path)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(str(dest_path), str(source_path))
                 result.success_count += 1
                 
             except (PermissionError, OSError) as e:
                 # 权限错误或其他OS错误
                 result.failed_count += 1
-                result.failed_files.append(record.destination_path)
+                result.failed_files.append(record_dest)
         
-        # 删除创建的空文件夹（逆序删除，先删除子文件夹）
-        sorted_folders = sorted(self._created_folders, key=len, reverse=True)
+        # 删除创建的空文件夹（按路径层级从深到浅，先删除子文件夹）
+        sorted_folders = sorted(self._created_folders, key=lambda f: len(Path(f).parts), reverse=True)
         for folder_path in sorted_folders:
             try:
                 folder = Path(folder_path)
@@ -115,7 +133,9 @@ class RollbackManager:
     
     def clear(self) -> None:
         """清空操作记录"""
-        self._records.clear()
+        self._sources.clear()
+        self._dests.clear()
+        self._timestamps.clear()
         self._created_folders.clear()
     
     def has_records(self) -> bool:
@@ -125,7 +145,7 @@ class RollbackManager:
         Returns:
             bool: 如果有记录返回True，否则返回False
         """
-        return len(self._records) > 0
+        return len(self._sources) > 0
     
     def get_record_count(self) -> int:
         """
@@ -134,4 +154,4 @@ class RollbackManager:
         Returns:
             int: 记录数量
         """
-        return len(self._records)
+        return len(self._sources)
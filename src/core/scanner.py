@@ -6,6 +6,7 @@
 
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -39,7 +40,10 @@ class AccessDeniedError(Exception):
 class ImageScanner:
     """扫描指定路径下的所有图片文件"""
     
-    SUPPORTED_FORMATS: tuple[str, ...] = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+    SUPPORTED_FORMATS: frozenset[str] = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'})
+    
+    # 图片验证以 I/O 为主（PIL 解码时释放 GIL），用多线程并行
+    VALIDATE_WORKERS = min(32, (os.cpu_count() or 4) * 4)
     
     def scan(self, path: str) -> ScanResult:
         """
@@ -69,33 +73,52 @@ class ImageScanner:
         
         result = ScanResult()
         
-        # 递归扫描目录
-        try:
-            for root, dirs, files in os.walk(path):
-                # 检查目录访问权限
-                if not os.access(root, os.R_OK):
-                    logger.warning(f"无法访问目录: {root}")
-                    continue
-                
-                for filename in files:
-                    file_path = os.path.join(root, filename)
-                    
-                    # 检查文件扩展名是否为支持的格式
-                    ext = os.path.splitext(filename)[1].lower()
-                    if ext not in self.SUPPORTED_FORMATS:
-                        continue
-                    
-                    # 验证图片是否有效
-                    if self.is_valid_image(file_path):
-                        result.image_paths.append(file_path)
-                        result.total_count += 1
-                    else:
-                        result.error_files.append(file_path)
-                        result.skipped_count += 1
-                        logger.warning(f"跳过损坏的图片文件: {file_path}")
+        # 递归扫描目录：用 os.scandir 显式栈遍历，DirEntry 自带类型信息，
+        # 不必对每个条目再做 stat；遍历顺序与 os.walk 相同（先文件，再按序进入子目录）
+        candidates: list[str] = []
+        stack = [path]
+        while stack:
+            root = stack.pop()
+            subdirs: list[str] = []
+            try:
+                with os.scandir(root) as entries:
+                    for entry in entries:
+                        # 与 os.walk 一致：不进入指向目录的符号链接
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                            continue
                         
-        except PermissionError as e:
-            raise AccessDeniedError(path, f"扫描过程中权限被拒绝: {e}")
+                        # 检查文件扩展名是否为支持的格式
+                        name = entry.name
+                        dot = name.rfind('.')
+                        if dot < 0 or name[dot:].lower() not in self.SUPPORTED_FORMATS:
+                            continue
+                        
+                        candidates.append(entry.path)
+            except OSError:
+                # 检查目录访问权限
+                logger.warning(f"无法访问目录: {root}")
+                continue
+            
+            stack.extend(reversed(subdirs))
+        
+        # 验证图片是否有效，map 按提交顺序返回，结果顺序与遍历顺序一致
+        workers = min(self.VALIDATE_WORKERS, len(candidates))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                validity = list(executor.map(self._is_valid_image_fast, candidates))
+        else:
+            validity = [self._is_valid_image_fast(file_path) for file_path in candidates]
+        
+        for file_path, valid in zip(candidates, validity):
+            if valid:
+                result.image_paths.append(file_path)
+                result.total_count += 1
+            else:
+                result.error_files.append(file_path)
+                result.skipped_count += 1
+                logger.warning(f"跳过损坏的图片文件: {file_path}")
         
         return result
     
@@ -122,11 +145,26 @@ class ImageScanner:
         if ext not in self.SUPPORTED_FORMATS:
             return False
         
-        # 尝试打开图片验证其有效性
+        return self._is_valid_image_fast(file_path)
+    
+    def _is_valid_image_fast(self, file_path: str) -> bool:
+        """
+        只通过解析文件头检查图片是否有效
+        
+        不再检查存在性、权限和扩展名，调用方需保证路径来自刚遍历到的目录条目
+        且扩展名已过滤；无法读取的文件在打开时同样会返回 False。
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            bool: 如果是有效图片返回True，否则返回False
+        """
+        # 尝试打开图片验证其有效性：Image.open 只解析文件头（魔数与尺寸/模式信息），
+        # 不像 verify() 那样遍历整个文件的数据块，大图也只需读取少量字节
         try:
-            with Image.open(file_path) as img:
-                # 验证图片可以被加载
-                img.verify()
+            with Image.open(file_path):
+                pass
             return True
         except Exception as e:
             logger.debug(f"图片验证失败 {file_path}: {e}")
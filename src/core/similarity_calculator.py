@@ -4,8 +4,13 @@
 计算图片之间的相似度，支持多种直方图距离度量。
 """
 
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from typing import Optional
+from scipy.spatial.distance import pdist
 
 from .models import (
     ImageFeatures,
@@ -25,6 +30,12 @@ class SimilarityCalculator:
     - 相关性 (Correlation)
     """
     
+    # 分块计算卡方距离时每块数据的目标大小（按保守的 L2 缓存容量估计）
+    L2_CACHE_BYTES = 512 * 1024
+    
+    # 卡方距离按列块分给多个线程（NumPy 运算期间释放 GIL）
+    DISTANCE_WORKERS = os.cpu_count() or 1
+    
     def __init__(self,
                  weights: Optional[FeatureWeights] = None,
                  metric: DistanceMetric = DistanceMetric.BHATTACHARYYA):
@@ -38,6 +49,36 @@ class SimilarityCalculator:
         self.weights = weights if weights else FeatureWeights()
         self.metric = metric
     
+    @property
+    def weights(self) -> FeatureWeights:
+        """特征权重配置"""
+        return self._weights
+    
+    @weights.setter
+    def weights(self, weights: FeatureWeights) -> None:
+        # 归一化权重在设置时算好，逐对计算时直接使用；
+        # 权重为 0 的通道不影响结果，直接不参与计算
+        normalized = weights.normalize()
+        self._channel_weights = [
+            (attr, weight) for attr, weight in (
+                ('hue_histogram', normalized.hue),
+                ('lightness_histogram', normalized.lightness),
+                ('saturation_histogram', normalized.saturation),
+            ) if weight != 0
+        ]
+        self._weights = weights
+    
+    @property
+    def metric(self) -> DistanceMetric:
+        """默认距离度量方法"""
+        return self._metric
+    
+    @metric.setter
+    def metric(self, metric: DistanceMetric) -> None:
+        # 设置度量时就绑定对应的距离函数，逐对计算时不再走 if/elif 分派
+        self._metric_fn = self._resolve_metric(metric)
+        self._metric = metric
+    
     def histogram_intersection(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
         """
         直方图交叉相似度
@@ -52,7 +93,7 @@ class SimilarityCalculator:
         Returns:
             相似度值 [0, 1]
         """
-        return float(np.sum(np.minimum(hist1, hist2)))
+        return float(np.minimum(hist1, hist2).sum())
     
     def chi_square_distance(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
         """
@@ -69,8 +110,11 @@ class SimilarityCalculator:
             距离值 [0, +inf)
         """
         eps = 1e-10
-        denominator = hist1 + hist2 + eps
-        return float(np.sum((hist1 - hist2) ** 2 / denominator))
+        diff = hist1 - hist2
+        denominator = hist1 + hist2
+        denominator += eps
+        # sum(d^2 / s) 写成点积，少一次平方和一次求和的临时数组
+        return float(np.dot(diff, diff / denominator))
     
     def bhattacharyya_distance(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
         """
@@ -86,10 +130,10 @@ class SimilarityCalculator:
         Returns:
             距离值 [0, +inf)
         """
-        bc = np.sum(np.sqrt(hist1 * hist2))
-        # 防止 log(0)
-        bc = np.clip(bc, 1e-10, 1.0)
-        return float(-np.log(bc))
+        bc = float(np.sqrt(hist1 * hist2).sum())
+        # 防止 log(0)；标量用 math 运算，避免 NumPy 标量的调用开销
+        bc = min(max(bc, 1e-10), 1.0)
+        return -math.log(bc)
     
     def correlation_similarity(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
         """
@@ -105,14 +149,12 @@ class SimilarityCalculator:
         Returns:
             相关性值 [-1, 1]
         """
-        mean1 = np.mean(hist1)
-        mean2 = np.mean(hist2)
-        
-        h1_centered = hist1 - mean1
-        h2_centered = hist2 - mean2
+        h1_centered = hist1 - hist1.mean()
+        h2_centered = hist2 - hist2.mean()
         
-        numerator = np.sum(h1_centered * h2_centered)
-        denominator = np.sqrt(np.sum(h1_centered ** 2) * np.sum(h2_centered ** 2))
+        # 乘加求和都用点积完成
+        numerator = np.dot(h1_centered, h2_centered)
+        denominator = math.sqrt(np.dot(h1_centered, h1_centered) * np.dot(h2_centered, h2_centered))
         
         if denominator < 1e-10:
             return 0.0
@@ -133,31 +175,49 @@ class SimilarityCalculator:
             距离值（已转换为 [0, 1] 范围，0 表示完全相同）
         """
         if metric is None:
-            metric = self.metric
+            return self._metric_fn(hist1, hist2)
+        return self._resolve_metric(metric)(hist1, hist2)
+    
+    def _resolve_metric(self, metric: DistanceMetric):
+        """
+        获取距离度量对应的归一化距离函数
         
+        Args:
+            metric: 距离度量方法
+            
+        Returns:
+            接收两个直方图、返回 [0, 1] 距离的函数
+            
+        Raises:
+            ValueError: 不支持的距离度量
+        """
         if metric == DistanceMetric.INTERSECTION:
-            # 交叉是相似度，转换为距离
-            return 1.0 - self.histogram_intersection(hist1, hist2)
-        
+            return self._intersection_distance
         elif metric == DistanceMetric.CHI_SQUARE:
-            # 卡方距离，归一化到 [0, 1]
-            dist = self.chi_square_distance(hist1, hist2)
-            # 使用 sigmoid 风格的归一化
-            return 1.0 - np.exp(-dist)
-        
+            return self._chi_square_normalized
         elif metric == DistanceMetric.BHATTACHARYYA:
-            # 巴氏距离，归一化到 [0, 1]
-            dist = self.bhattacharyya_distance(hist1, hist2)
-            return 1.0 - np.exp(-dist)
-        
+            return self._bhattacharyya_normalized
         elif metric == DistanceMetric.CORRELATION:
-            # 相关性是相似度 [-1, 1]，转换为距离 [0, 1]
-            corr = self.correlation_similarity(hist1, hist2)
-            return (1.0 - corr) / 2.0
-        
+            return self._correlation_distance
         else:
             raise ValueError(f"不支持的距离度量: {metric}")
     
+    def _intersection_distance(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
+        """交叉是相似度，转换为距离"""
+        return 1.0 - self.histogram_intersection(hist1, hist2)
+    
+    def _chi_square_normalized(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
+        """卡方距离，使用 sigmoid 风格归一化到 [0, 1]"""
+        return 1.0 - math.exp(-self.chi_square_distance(hist1, hist2))
+    
+    def _bhattacharyya_normalized(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
+        """巴氏距离，归一化到 [0, 1]"""
+        return 1.0 - math.exp(-self.bhattacharyya_distance(hist1, hist2))
+    
+    def _correlation_distance(self, hist1: np.ndarray, hist2: np.ndarray) -> float:
+        """相关性是相似度 [-1, 1]，转换为距离 [0, 1]"""
+        return (1.0 - self.correlation_similarity(hist1, hist2)) / 2.0
+    
     def compute_similarity(self, features1: ImageFeatures, features2: ImageFeatures) -> float:
         """
         计算两张图片的综合相似度
@@ -172,29 +232,65 @@ class SimilarityCalculator:
         Returns:
             相似度值 [0, 1]，1 表示完全相同
         """
-        weights = self.weights.normalize()
-        
-        # 计算各通道距离
-        hue_dist = self.compute_histogram_distance(
-            features1.hue_histogram, features2.hue_histogram
-        )
-        lightness_dist = self.compute_histogram_distance(
-            features1.lightness_histogram, features2.lightness_histogram
-        )
-        saturation_dist = self.compute_histogram_distance(
-            features1.saturation_histogram, features2.saturation_histogram
-        )
-        
-        # 加权平均距离
-        weighted_dist = (
-            weights.hue * hue_dist +
-            weights.lightness * lightness_dist +
-            weights.saturation * saturation_dist
-        )
+        # 各通道距离的加权平均
+        weighted_dist = 0.0
+        for attr, weight in self._channel_weights:
+            weighted_dist += weight * self._feature_distance(features1, features2, attr)
         
         # 转换为相似度
         return 1.0 - weighted_dist
     
+    def _feature_distance(self, features1: ImageFeatures, features2: ImageFeatures,
+                          attr: str) -> float:
+        """
+        计算两张图片某个通道直方图的距离
+        
+        巴氏距离和相关性使用每张图片缓存的派生量（sqrt 直方图、去均值直方图及其模长），
+        每对图片只剩一次点积；其他度量与 compute_histogram_distance 相同。
+        
+        Args:
+            features1: 第一张图片的特征
+            features2: 第二张图片的特征
+            attr: 直方图属性名
+            
+        Returns:
+            距离值（[0, 1] 范围，0 表示完全相同）
+        """
+        if self.metric == DistanceMetric.BHATTACHARYYA:
+            bc = float(np.dot(self._sqrt_histogram(features1, attr),
+                              self._sqrt_histogram(features2, attr)))
+            # 1 - exp(ln(bc)) 即 1 - bc
+            return 1.0 - min(max(bc, 1e-10), 1.0)
+        
+        if self.metric == DistanceMetric.CORRELATION:
+            centered1, norm1 = self._centered_histogram(features1, attr)
+            centered2, norm2 = self._centered_histogram(features2, attr)
+            denominator = norm1 * norm2
+            corr = 0.0 if denominator < 1e-10 else float(np.dot(centered1, centered2)) / denominator
+            return (1.0 - corr) / 2.0
+        
+        return self._metric_fn(getattr(features1, attr), getattr(features2, attr))
+    
+    @staticmethod
+    def _sqrt_histogram(features: ImageFeatures, attr: str) -> np.ndarray:
+        """获取（并缓存）直方图的逐元素平方根"""
+        key = ('sqrt', attr)
+        cached = features._derived.get(key)
+        if cached is None:
+            cached = features._derived[key] = np.sqrt(getattr(features, attr))
+        return cached
+    
+    @staticmethod
+    def _centered_histogram(features: ImageFeatures, attr: str) -> tuple[np.ndarray, float]:
+        """获取（并缓存）去均值后的直方图及其模长"""
+        key = ('centered', attr)
+        cached = features._derived.get(key)
+        if cached is None:
+            hist = getattr(features, attr)
+            centered = hist - hist.mean()
+            cached = features._derived[key] = (centered, math.sqrt(np.dot(centered, centered)))
+        return cached
+    
     def compute_distance(self, features1: ImageFeatures, features2: ImageFeatures) -> float:
         """
         计算两张图片的综合距离
@@ -208,26 +304,283 @@ class SimilarityCalculator:
         """
         return 1.0 - self.compute_similarity(features1, features2)
     
-    def build_distance_matrix(self, features_list: list[ImageFeatures]) -> np.ndarray:
+    @staticmethod
+    def _pair_sums_minus(sums: np.ndarray, condensed: np.ndarray) -> np.ndarray:
+        """
+        原地把压缩向量中的每一对 (i, j) 改写为 sums[i] + sums[j] - condensed[(i, j)]
+        
+        逐行处理：第 i 行的 (i, i+1..n-1) 在压缩向量中连续存放，
+        不展开 N(N-1)/2 大小的下标数组和中间结果。
+        
+        Args:
+            sums: 每张图片的标量 (N,)
+            condensed: 长度 N(N-1)/2 的压缩向量，原地修改
+            
+        Returns:
+            condensed 本身
+        """
+        n = len(sums)
+        start = 0
+        for i in range(n - 1):
+            row = condensed[start:start + n - i - 1]
+            np.subtract(sums[i] + sums[i + 1:], row, out=row)
+            start += n - i - 1
+        return condensed
+    
+    def _channel_distances(self, hists: np.ndarray, metric: DistanceMetric) -> np.ndarray:
+        """
+        计算单个通道所有图片对的距离（压缩形式）
+        
+        与 compute_histogram_distance 结果一致，但整体向量化：
+        交叉距离由 L1 距离推出，巴氏距离由 sqrt 直方图的分块矩阵乘积得到。
+        
+        Args:
+            hists: 堆叠后的直方图 (N, bins)
+            metric: 距离度量方法
+            
+        Returns:
+            长度 N(N-1)/2 的压缩距离向量，范围 [0, 1]
+        """
+        if metric == DistanceMetric.INTERSECTION:
+            # sum(min(a, b)) = (sum(a) + sum(b) - |a - b|_1) / 2
+            intersection = self._pair_sums_minus(hists.sum(axis=1), pdist(hists, 'cityblock'))
+            intersection /= 2
+            return np.subtract(1.0, intersection, out=intersection)
+        
+        elif metric == DistanceMetric.CHI_SQUARE:
+            # 1 - exp(-d) 原地完成，不再为中间结果分配同样大小的数组
+            chi = self._chi_square_condensed(hists)
+            np.negative(chi, out=chi)
+            np.exp(chi, out=chi)
+            return np.subtract(1.0, chi, out=chi)
+        
+        elif metric == DistanceMetric.BHATTACHARYYA:
+            return self._bhattacharyya_condensed(hists)
+        
+        elif metric == DistanceMetric.CORRELATION:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr_dist = pdist(hists, 'correlation')
+            # 常数直方图相关性记为 0，对应距离 0.5
+            return np.where(np.isnan(corr_dist), 0.5, corr_dist / 2.0)
+        
+        else:
+            raise ValueError(f"不支持的距离度量: {metric}")
+    
+    def _bhattacharyya_condensed(self, hists: np.ndarray) -> np.ndarray:
+        """
+        所有图片对的归一化巴氏距离（压缩形式）
+        
+        1 - exp(-(-ln(bc))) 即 1 - bc，而所有图片对的 bc = sum(sqrt(a*b))
+        正是 sqrt 直方图矩阵与自身转置的乘积。按行分块做矩阵乘法，每块只与
+        它之后的行相乘，上三角部分直接写入压缩向量，不分配 N×N 的方阵。
+        
+        Args:
+            hists: 堆叠后的直方图 (N, bins)
+            
+        Returns:
+            长度 N(N-1)/2 的距离向量，范围 [0, 1]
+        """
+        n = hists.shape[0]
+        sqrt_hists = np.sqrt(hists)
+        condensed = np.empty(n * (n - 1) // 2, dtype=sqrt_hists.dtype)
+        
+        # 每块乘积 (block, N) 控制在 L2 缓存大小以内
+        block = max(1, self.L2_CACHE_BYTES // (n * sqrt_hists.itemsize))
+        for i0 in range(0, n - 1, block):
+            i1 = min(i0 + block, n - 1)
+            bc = sqrt_hists[i0:i1] @ sqrt_hists[i0:].T
+            for i in range(i0, i1):
+                # 第 i 行的 (i, i+1..n-1) 在压缩向量中连续存放
+                start = n * i - i * (i + 1) // 2
+                condensed[start:start + n - i - 1] = bc[i - i0, i - i0 + 1:]
+        
+        np.clip(condensed, 1e-10, 1.0, out=condensed)
+        return np.subtract(1.0, condensed, out=condensed)
+    
+    def _chi_square_condensed(self, hists: np.ndarray) -> np.ndarray:
         """
-        构建图片间的距离矩阵
+        所有图片对的卡方距离（压缩形式，未归一化）
+        
+        按列分块：每块直方图（连同两个同样大小的临时数组）能放进 L2 缓存，
+        块内被所有在它之前的行依次复用，而不是每一行都从内存重新读一遍后面所有行。
+        
+        Args:
+            hists: 堆叠后的直方图 (N, bins)
+            
+        Returns:
+            长度 N(N-1)/2 的卡方距离向量
+        """
+        n, bins = hists.shape
+        chi = np.empty(n * (n - 1) // 2, dtype=np.float64)
+        
+        tile = max(16, self.L2_CACHE_BYTES // (3 * bins * hists.itemsize))
+        # 越靠后的列块参与的行越多，先提交大块，线程间负载更均衡
+        panels = [(j0, min(j0 + tile, n)) for j0 in reversed(range(1, n, tile))]
+        
+        # 各列块写入压缩向量中互不重叠的位置，可以并行计算
+        workers = min(self.DISTANCE_WORKERS, len(panels))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda panel: self._chi_square_panel(hists, chi, *panel),
+                                  panels))
+        else:
+            for j0, j1 in panels:
+                self._chi_square_panel(hists, chi, j0, j1)
+        
+        return chi
+    
+    @staticmethod
+    def _chi_square_panel(hists: np.ndarray, chi: np.ndarray, j0: int, j1: int) -> None:
+        """
+        计算列块 [j0, j1) 与所有在它之前的行之间的卡方距离
+        
+        Args:
+            hists: 堆叠后的直方图 (N, bins)
+            chi: 输出的压缩距离向量，结果写入对应位置
+            j0: 列块起始下标
+            j1: 列块结束下标（不含）
+        """
+        n = hists.shape[0]
+        eps = hists.dtype.type(1e-10)
+        panel = hists[j0:j1]
+        diff_buf = np.empty_like(panel)
+        denom_buf = np.empty_like(panel)
+        
+        for i in range(j1 - 1):
+            # 第 i 行只与列号大于 i 的部分计算
+            lo = max(j0, i + 1)
+            rest = panel[lo - j0:]
+            m = len(rest)
+            diff = np.subtract(rest, hists[i], out=diff_buf[:m])
+            denominator = np.add(rest, hists[i], out=denom_buf[:m])
+            denominator += eps
+            diff *= diff
+            diff /= denominator
+            # (i, lo) 在压缩向量中的下标
+            start = n * i - i * (i + 1) // 2 + lo - i - 1
+            chi[start:start + m] = diff.sum(axis=1)
+    
+    def _chi_square_pairs(self, hists: np.ndarray, rows: np.ndarray,
+                          cols: np.ndarray) -> np.ndarray:
+        """
+        只计算指定图片对的卡方距离（未归一化）
+        
+        Args:
+            hists: 堆叠后的直方图 (N, bins)
+            rows: 每对图片的行下标
+            cols: 每对图片的列下标
+            
+        Returns:
+            与 rows 等长的卡方距离向量
+        """
+        bins = hists.shape[1]
+        eps = hists.dtype.type(1e-10)
+        chi = np.empty(len(rows), dtype=np.float64)
+        
+        # 按块取出图片对，每块的临时数组控制在 L2 缓存大小以内
+        chunk = max(16, self.L2_CACHE_BYTES // (3 * bins * hists.itemsize))
+        for s0 in range(0, len(rows), chunk):
+            s1 = s0 + chunk
+            a = hists[rows[s0:s1]]
+            b = hists[cols[s0:s1]]
+            diff = a - b
+            a += b
+            a += eps
+            diff *= diff
+            diff /= a
+            chi[s0:s1] = diff.sum(axis=1)
+        
+        return chi
+    
+    @staticmethod
+    def _condensed_to_pairs(n: int, index: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        把压缩向量下标换算为 (i, j) 下标对，i < j
+        
+        Args:
+            n: 图片数量
+            index: 压缩向量中的下标
+            
+        Returns:
+            (rows, cols) 两个下标数组
+        """
+        # 下标 k 所在行满足 n*i - i*(i+1)/2 <= k，解二次不等式求 i
+        k = index.astype(np.float64)
+        rows = (n - 2 - np.floor(np.sqrt(4.0 * n * (n - 1) - 8.0 * k - 7.0) / 2.0 - 0.5)).astype(np.intp)
+        cols = index - (n * rows - rows * (rows + 1) // 2) + rows + 1
+        return rows, cols
+    
+    @staticmethod
+    def _stack(features_list: list[ImageFeatures], attr: str) -> np.ndarray:
+        """
+        把所有图片的某个直方图堆叠为 float32 矩阵
         
         Args:
             features_list: 图片特征列表
+            attr: 直方图属性名
             
         Returns:
-            N×N 对称距离矩阵
+            直方图矩阵 (N, bins)，float32
+        """
+        return np.stack([getattr(f, attr) for f in features_list]).astype(np.float32, copy=False)
+    
+    def build_distance_matrix(self, features_list: list[ImageFeatures],
+                              threshold: Optional[float] = None) -> np.ndarray:
+        """
+        构建图片间的距离矩阵（压缩形式）
+        
+        只存储上三角，布局与 scipy.spatial.distance.pdist 一致：
+        (i, j), i < j 位于下标 n*i - i*(i+1)/2 + j - i - 1。
+        需要方阵时可用 scipy.spatial.distance.squareform 展开。
+        
+        给定 threshold 时，距离超过阈值的图片对统一记为 threshold。
+        各通道距离非负，加权和一旦超过阈值即可确定，卡方距离的后续通道
+        只为尚未确定的图片对计算。
+        
+        Args:
+            features_list: 图片特征列表
+            threshold: 距离上限，None 则计算完整距离
+            
+        Returns:
+            长度 N(N-1)/2 的压缩距离向量（float32，颜色特征不需要双精度）
         """
         n = len(features_list)
-        matrix = np.zeros((n, n), dtype=np.float64)
+        if n < 2:
+            return np.zeros(0, dtype=np.float32)
         
-        for i in range(n):
-            for j in range(i + 1, n):
-                dist = self.compute_distance(features_list[i], features_list[j])
-                matrix[i, j] = dist
-                matrix[j, i] = dist  # 对称
+        channel_weights = self._channel_weights
+        if threshold is not None:
+            # 权重大的通道先算，更多图片对能尽早超过阈值
+            channel_weights = sorted(channel_weights, key=lambda item: item[1], reverse=True)
+        
+        distances = None
+        for attr, weight in channel_weights:
+            hists = self._stack(features_list, attr)
+            
+            if (distances is not None and threshold is not None
+                    and self.metric == DistanceMetric.CHI_SQUARE):
+                pending = np.flatnonzero(distances < threshold)
+                # 待定的图片对不多时才值得逐对计算，否则整体分块计算更快
+                if len(pending) < len(distances) // 2:
+                    rows, cols = self._condensed_to_pairs(n, pending)
+                    chi = self._chi_square_pairs(hists, rows, cols)
+                    np.negative(chi, out=chi)
+                    np.exp(chi, out=chi)
+                    np.subtract(1.0, chi, out=chi)
+                    chi *= weight
+                    distances[pending] += chi
+                    continue
+            
+            channel = self._channel_distances(hists, self.metric)
+            channel *= weight
+            if distances is None:
+                distances = channel
+            else:
+                distances += channel
         
-        return matrix
+        if threshold is not None:
+            np.minimum(distances, threshold, out=distances)
+        return distances.astype(np.float32, copy=False)
     
     def set_weights(self, weights: FeatureWeights) -> None:
         """设置特征权重"""
@@ -4,6 +4,7 @@
 
 import sys
 import os
+import multiprocessing
 
 # 打包环境设置
 if getattr(sys, 'frozen', False):
@@ -16,13 +17,14 @@ else:
 
 sys.path.insert(0, base_path)
 
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QFont
-from ui import MainWindow
-
 
 def main():
     try:
+        # PyQt6 与主窗口在启动时才导入，导入本模块不会连带加载 Qt 和全部 UI 代码
+        from PyQt6.QtWidgets import QApplication
+        from PyQt6.QtGui import QFont
+        from ui.main_window import MainWindow
+        
         app = QApplication(sys.argv)
         app.setApplicationName("图片颜色分类器")
         
@@ -45,4 +47,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序使用多进程提取特征时需要
+    multiprocessing.freeze_support()
     main()
@@ -1,7 +1,24 @@
 # UI 模块
 
-from .main_window import MainWindow
-from .styles import COLORS, get_stylesheet
-from .win_effects import enable_acrylic, enable_rounded_corners
+# 子模块按需导入：只用到样式常量时不必加载整个主窗口
+_LAZY_IMPORTS = {
+    "MainWindow": ".main_window",
+    "COLORS": ".styles",
+    "get_stylesheet": ".styles",
+    "enable_acrylic": ".win_effects",
+    "enable_rounded_corners": ".win_effects",
+}
 
 __all__ = ['MainWindow', 'COLORS', 'get_stylesheet', 'enable_acrylic', 'enable_rounded_corners']
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到模块命名空间，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
@@ -4,21 +4,25 @@
 
 import os
 import sys
+import time
+from collections import namedtuple
+from functools import lru_cache, partial
 
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QSettings, QPoint, QPropertyAnimation, QEasingCurve, QRect
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal, QTimer, QSettings, QPoint, QPropertyAnimation, QEasingCurve, QRect
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QPushButton, QLabel, QLineEdit, QProgressBar, QFileDialog,
     QMessageBox, QScrollArea, QFrame, QComboBox, QSlider, QSpinBox,
     QTabWidget,
 )
-from PyQt6.QtGui import QPixmap, QMouseEvent, QIcon, QWheelEvent
+from PyQt6.QtGui import QPixmap, QPixmapCache, QMouseEvent, QIcon, QWheelEvent
 
 from .styles import (
     get_stylesheet, get_card_style, COLORS, COLORS_LIGHT, COLORS_DARK,
     PRIMARY_BTN, SECONDARY_BTN, TITLEBAR_BTN, CLOSE_BTN,
     SUBTITLE_STYLE, CAPTION_STYLE, get_button_styles, set_dark_mode,
     get_subtitle_style, get_caption_style, get_toggle_style,
+    TITLEBAR_TITLE_CSS, TITLEBAR_BTN_CSS, TITLEBAR_CLOSE_CSS, STYLESHEETS,
 )
 from .win_effects import enable_acrylic, enable_rounded_corners
 
@@ -29,37 +33,102 @@ from core.models import AdvancedClassificationResult, FeatureWeights
 import shutil
 
 
+# 主题相关的几段样式表
+ThemeCss = namedtuple('ThemeCss', ['titlebar', 'title_label', 'btn', 'close', 'content_frame'])
+
+
+@lru_cache(maxsize=64)
+def _build_theme_css(dark_mode: bool, opacity: int) -> ThemeCss:
+    """生成主题相关的样式表，按夜间模式和透明度缓存"""
+    # 计算基于透明度的 alpha 值 (opacity 30-200 映射到 0.2-0.6)
+    alpha = 0.2 + (opacity - 30) / 170 * 0.4
+    
+    if dark_mode:
+        titlebar_bg = f"rgba(30, 30, 30, {alpha})"
+        content_bg = f"rgba(40, 40, 40, {alpha + 0.1})"
+    else:
+        titlebar_bg = f"rgba(255, 255, 255, {alpha})"
+        content_bg = f"rgba(255, 255, 255, {alpha + 0.1})"
+    
+    titlebar = f"""
+            QFrame#titlebar {{
+                background-color: {titlebar_bg};
+                border: none;
+                border-top-left-radius: 8px;
+                border-top-right-radius: 8px;
+            }}
+        """
+    
+    # 内容区域样式
+    content_frame = f"""
+            QFrame#contentFrame {{
+                background-color: {content_bg};
+                border-bottom-left-radius: 8px;
+                border-bottom-right-radius: 8px;
+            }}
+        """
+    return ThemeCss(titlebar, TITLEBAR_TITLE_CSS[dark_mode], TITLEBAR_BTN_CSS[dark_mode],
+                    TITLEBAR_CLOSE_CSS[dark_mode], content_frame)
+
+
+def _set_percent_text(label: QLabel, value: int):
+    """把滑块数值以百分比显示在标签上"""
+    label.setText(f"{value}%")
+
+
 class NoWheelSlider(QSlider):
     """禁用滚轮的滑块"""
     def wheelEvent(self, event: QWheelEvent):
         event.ignore()  # 忽略滚轮事件，让父控件处理
 
 
-class Worker(QThread):
-    """分类工作线程"""
+class WorkerSignals(QObject):
+    """分类任务的信号（QRunnable 不是 QObject，信号放在单独的对象上）"""
     progress = pyqtSignal(int, int, str)
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
+
+
+class WorkerRunnable(QRunnable):
+    """分类任务，在主窗口的线程池中运行"""
+    
+    # 进度信号的最小间隔（约 30 次/秒）
+    EMIT_INTERVAL = 0.033
     
     def __init__(self, engine, source, target=None, n_clusters=None, advanced=False):
         super().__init__()
+        self.signals = WorkerSignals()
         self.engine, self.source, self.target = engine, source, target
         self.n_clusters, self.advanced = n_clusters, advanced
+        self._last_emit = float("-inf")
+    
+    def _emit_progress(self, current, total, fname):
+        # 节流跨线程的进度信号，避免大量图片时界面线程被事件淹没；
+        # 阶段开始（current 为 0）和完成时的进度总是发出
+        now = time.monotonic()
+        if current == 0 or current == total or now - self._last_emit > self.EMIT_INTERVAL:
+            self._last_emit = now
+            self.signals.progress.emit(current, total, fname)
     
     def run(self):
         try:
-            cb = lambda c, t, f: self.progress.emit(c, t, f)
+            cb = self._emit_progress
             if self.advanced:
                 r = self.engine.classify(self.source, self.target, n_clusters=self.n_clusters, progress_callback=cb)
             else:
                 r = self.engine.classify(self.source, self.target, progress_callback=cb)
-            self.finished.emit(r)
+            self.signals.finished.emit(r)
         except Exception as e:
-            self.error.emit(str(e))
+            self.signals.error.emit(str(e))
 
 
 class TitleBar(QFrame):
     """自定义标题栏 - 使用 QFrame 确保有背景可以接收鼠标事件"""
+    
+    # 窗口控制按钮尺寸
+    BTN_WIDTH = 46
+    BTN_COUNT = 3
+    
     def __init__(self, parent):
         super().__init__(parent)
         self.parent_window = parent
@@ -85,63 +154,41 @@ class TitleBar(QFrame):
         
         # 标题
         self.title = QLabel("图片颜色分类器")
-        self.title.setStyleSheet(f"font-size: 13px; color: {COLORS['text']}; background: transparent;")
+        dark_mode = self.parent_window._dark_mode
+        self.title.setStyleSheet(TITLEBAR_TITLE_CSS[dark_mode])
         layout.addWidget(self.title)
         layout.addStretch()
         
         # 窗口控制按钮
         self._min_btn = QPushButton("─")
         self._min_btn.setObjectName("minBtn")
-        self._min_btn.setFixedSize(46, 40)
+        self._min_btn.setFixedSize(self.BTN_WIDTH, 40)
         self._min_btn.clicked.connect(self._on_minimize)
         layout.addWidget(self._min_btn)
         
         self._max_btn = QPushButton("□")
         self._max_btn.setObjectName("maxBtn")
-        self._max_btn.setFixedSize(46, 40)
+        self._max_btn.setFixedSize(self.BTN_WIDTH, 40)
         self._max_btn.clicked.connect(self._on_maximize)
         layout.addWidget(self._max_btn)
         
         self._close_btn = QPushButton("✕")
         self._close_btn.setObjectName("closeBtn")
-        self._close_btn.setFixedSize(46, 40)
+        self._close_btn.setFixedSize(self.BTN_WIDTH, 40)
         self._close_btn.clicked.connect(self._on_close)
         layout.addWidget(self._close_btn)
         
         # 按钮样式
-        btn_style = f"""
-            QPushButton {{
-                background: transparent;
-                border: none;
-                color: {COLORS['text']};
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background: rgba(0, 0, 0, 0.08);
-            }}
-            QPushButton:pressed {{
-                background: rgba(0, 0, 0, 0.15);
-            }}
-        """
-        close_style = f"""
-            QPushButton {{
-                background: transparent;
-                border: none;
-                color: {COLORS['text']};
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background: #E81123;
-                color: white;
-            }}
-            QPushButton:pressed {{
-                background: #F1707A;
-                color: white;
-            }}
-        """
-        self._min_btn.setStyleSheet(btn_style)
-        self._max_btn.setStyleSheet(btn_style)
-        self._close_btn.setStyleSheet(close_style)
+        self._min_btn.setStyleSheet(TITLEBAR_BTN_CSS[dark_mode])
+        self._max_btn.setStyleSheet(TITLEBAR_BTN_CSS[dark_mode])
+        self._close_btn.setStyleSheet(TITLEBAR_CLOSE_CSS[dark_mode])
+        
+        # 按钮固定宽度且紧贴右侧，横坐标超过该值即点在按钮上
+        self._btn_hit_x = self.width() - self.BTN_WIDTH * self.BTN_COUNT
+    
+    def resizeEvent(self, event):
+        self._btn_hit_x = self.width() - self.BTN_WIDTH * self.BTN_COUNT
+        super().resizeEvent(event)
     
     def _on_minimize(self):
         self.parent_window.showMinimized()
@@ -160,12 +207,10 @@ class TitleBar(QFrame):
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             # 检查是否点击在按钮上
-            click_pos = event.position().toPoint()
-            for btn in [self._min_btn, self._max_btn, self._close_btn]:
-                if btn.geometry().contains(click_pos):
-                    # 点击在按钮上，不处理拖拽
-                    super().mousePressEvent(event)
-                    return
+            if event.position().x() >= self._btn_hit_x:
+                # 点击在按钮上，不处理拖拽
+                super().mousePressEvent(event)
+                return
             
             # 开始拖拽
             self._dragging = True
@@ -201,11 +246,9 @@ class TitleBar(QFrame):
     def mouseDoubleClickEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             # 检查是否双击在按钮上
-            click_pos = event.position().toPoint()
-            for btn in [self._min_btn, self._max_btn, self._close_btn]:
-                if btn.geometry().contains(click_pos):
-                    super().mouseDoubleClickEvent(event)
-                    return
+            if event.position().x() >= self._btn_hit_x:
+                super().mouseDoubleClickEvent(event)
+                return
             # 双击标题栏切换最大化
             self._on_maximize()
             event.accept()
@@ -215,6 +258,14 @@ class AnimatedToggle(QWidget):
     """带动画的胶囊形 Toggle 开关"""
     toggled = pyqtSignal(bool)
     
+    # 背景样式只有四种，按 (checked, dark_mode) 预先生成
+    _BG_CSS = {
+        (checked, dark): f"background: {c['accent'] if checked else c['border_strong']}; "
+                         f"border: none; border-radius: 11px;"
+        for checked in (False, True)
+        for dark, c in ((False, COLORS_LIGHT), (True, COLORS_DARK))
+    }
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFixedSize(44, 22)
@@ -238,11 +289,7 @@ class AnimatedToggle(QWidget):
         self._knob_anim.setEasingCurve(QEasingCurve.Type.OutBack)  # 带回弹的阻尼效果
     
     def _get_bg_style(self):
-        c = COLORS_DARK if self._dark_mode else COLORS_LIGHT
-        if self._checked:
-            return f"background: {c['accent']}; border: none; border-radius: 11px;"
-        else:
-            return f"background: {c['border_strong']}; border: none; border-radius: 11px;"
+        return self._BG_CSS[(self._checked, self._dark_mode)]
     
     def setChecked(self, checked: bool):
         self._checked = checked
@@ -310,13 +357,23 @@ class MainWindow(QMainWindow):
     # 边缘缩放相关常量
     EDGE_MARGIN = 8  # 边缘检测区域宽度
     
+    # 预览缩略图
+    THUMB_SIZE = 80
+    PIXMAP_CACHE_KB = 32 * 1024  # QPixmapCache 上限 32 MB
+    
     def __init__(self):
         super().__init__()
+        QPixmapCache.setCacheLimit(self.PIXMAP_CACHE_KB)
         self._engine = ClassificationEngine()
         self._adv_engine = AdvancedClassificationEngine()
         self._preview_gen = PreviewGenerator()
         self._worker = None
+        # 分类任务的线程池：只有一个常驻线程，多次分类复用同一线程
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._pool.setExpiryTimeout(-1)
         self._advanced = False
+        self._cards = []  # 所有卡片，切换主题时逐个更新标题样式
         
         # 边缘缩放状态
         self._resize_edge = None  # 当前缩放的边缘
@@ -324,13 +381,29 @@ class MainWindow(QMainWindow):
         self._resize_start_geo = None  # 缩放开始时的窗口几何
         
         self._settings = QSettings("ColorClassifier", "Settings")
+        # 设置改动先记在这里，空闲一段时间或关闭窗口时再统一写入
+        self._pending_settings = {}
+        self._settings_flush = QTimer(self)
+        self._settings_flush.setSingleShot(True)
+        self._settings_flush.setInterval(500)
+        self._settings_flush.timeout.connect(self._flush_settings)
         self._opacity = self._settings.value("opacity", 120, int)
         self._blur_color = self._settings.value("blur_color", 0xE8E8E8, int)
         self._dark_mode = self._settings.value("dark_mode", False, bool)
         
+        # 最近一次应用的主题样式表和窗口样式表，用于跳过未变化的 setStyleSheet
+        self._last_css = None
+        self._window_css = None
+        
         # 应用主题
         set_dark_mode(self._dark_mode)
         
+        # 拖动滑块等连续操作合并为一次窗口效果更新（重启计时器即可合并）
+        self._effects_timer = QTimer(self)
+        self._effects_timer.setSingleShot(True)
+        self._effects_timer.setInterval(40)
+        self._effects_timer.timeout.connect(self._apply_effects)
+        
         self._init_window()
         self._init_ui()
         QTimer.singleShot(100, self._apply_effects)
@@ -341,7 +414,7 @@ class MainWindow(QMainWindow):
         self.resize(1000, 780)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setStyleSheet(get_stylesheet(self._dark_mode))
+        self._set_window_stylesheet(STYLESHEETS[self._dark_mode])
         # 启用鼠标追踪以检测边缘悬停
         self.setMouseTracking(True)
         
@@ -370,79 +443,38 @@ class MainWindow(QMainWindow):
         if not enable_acrylic(self, color):
             self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, False)
             fallback = "#202020" if self._dark_mode else "#F0F0F0"
-            self.setStyleSheet(get_stylesheet(self._dark_mode) + f"QMainWindow{{background:{fallback};}}")
+            self._set_window_stylesheet(STYLESHEETS[self._dark_mode] + f"QMainWindow{{background:{fallback};}}")
         
         # 更新标题栏和内容区域的透明度
         self._update_theme_styles()
     
+    def _set_window_stylesheet(self, css):
+        """设置窗口样式表；内容未变时跳过，重设会重新 polish 所有子控件"""
+        if css != self._window_css:
+            self._window_css = css
+            self.setStyleSheet(css)
+    
     def _update_theme_styles(self):
         """更新主题相关的样式"""
-        c = COLORS_DARK if self._dark_mode else COLORS_LIGHT
-        
-        # 计算基于透明度的 alpha 值 (opacity 30-200 映射到 0.2-0.6)
-        alpha = 0.2 + (self._opacity - 30) / 170 * 0.4
-        
-        # 更新标题栏样式
-        if self._dark_mode:
-            titlebar_bg = f"rgba(30, 30, 30, {alpha})"
-            content_bg = f"rgba(40, 40, 40, {alpha + 0.1})"
-        else:
-            titlebar_bg = f"rgba(255, 255, 255, {alpha})"
-            content_bg = f"rgba(255, 255, 255, {alpha + 0.1})"
-        
-        self._titlebar.setStyleSheet(f"""
-            QFrame#titlebar {{
-                background-color: {titlebar_bg};
-                border: none;
-                border-top-left-radius: 8px;
-                border-top-right-radius: 8px;
-            }}
-        """)
-        self._titlebar.title.setStyleSheet(f"font-size: 13px; color: {c['text']}; background: transparent;")
-        
-        # 更新标题栏按钮样式
-        btn_style = f"""
-            QPushButton {{
-                background: transparent;
-                border: none;
-                color: {c['text']};
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background: {c['titlebar_hover']};
-            }}
-            QPushButton:pressed {{
-                background: {c['border_strong']};
-            }}
-        """
-        close_style = f"""
-            QPushButton {{
-                background: transparent;
-                border: none;
-                color: {c['text']};
-                font-size: 12px;
-            }}
-            QPushButton:hover {{
-                background: #E81123;
-                color: white;
-            }}
-            QPushButton:pressed {{
-                background: #F1707A;
-                color: white;
-            }}
-        """
-        self._titlebar._min_btn.setStyleSheet(btn_style)
-        self._titlebar._max_btn.setStyleSheet(btn_style)
-        self._titlebar._close_btn.setStyleSheet(close_style)
+        css = _build_theme_css(self._dark_mode, self._opacity)
+        last = self._last_css
+        
+        # 只重设发生变化的样式表，每次 setStyleSheet 都会触发 CSS 解析和重新 polish；
+        # 拖动透明度滑块时只有标题栏和内容区域的背景会变
+        targets = (
+            ('titlebar', (self._titlebar,)),
+            ('title_label', (self._titlebar.title,)),
+            ('btn', (self._titlebar._min_btn, self._titlebar._max_btn)),
+            ('close', (self._titlebar._close_btn,)),
+            ('content_frame', (self._content_frame,)),
+        )
+        for field, widgets in targets:
+            value = getattr(css, field)
+            if last is None or getattr(last, field) != value:
+                for widget in widgets:
+                    widget.setStyleSheet(value)
         
-        # 更新内容区域样式
-        self._content_frame.setStyleSheet(f"""
-            QFrame#contentFrame {{
-                background-color: {content_bg};
-                border-bottom-left-radius: 8px;
-                border-bottom-right-radius: 8px;
-            }}
-        """)
+        self._last_css = css
     
     def _init_ui(self):
         central = QWidget()
@@ -469,7 +501,12 @@ class MainWindow(QMainWindow):
         self._tabs = QTabWidget()
         self._tabs.setMouseTracking(True)  # 启用鼠标追踪
         self._tabs.addTab(self._create_main_page(), "分类")
-        self._tabs.addTab(self._create_settings_page(), "设置")
+        # 设置页在第一次切换过去时才创建，先放一个空容器占位
+        self._settings_page = QWidget()
+        self._settings_page_layout = QVBoxLayout(self._settings_page)
+        self._settings_page_layout.setContentsMargins(0, 0, 0, 0)
+        self._tabs.addTab(self._settings_page, "设置")
+        self._tabs.currentChanged.connect(self._on_tab_change)
         content_layout.addWidget(self._tabs)
         
         main_layout.addWidget(self._content_frame, 1)
@@ -507,6 +544,7 @@ class MainWindow(QMainWindow):
         layout.setSpacing(16)
         
         self._settings_card = Card("外观设置")
+        self._cards.append(self._settings_card)
         
         # 夜间模式切换 - 带动画的胶囊形 Toggle
         row0 = QHBoxLayout()
@@ -548,7 +586,8 @@ class MainWindow(QMainWindow):
             btn = QPushButton(name)
             btn.setStyleSheet(SECONDARY_BTN)
             btn.setFixedSize(60, 32)
-            btn.clicked.connect(lambda _, c=color: self._set_blur_color(c))
+            btn.setProperty("blurColor", color)
+            btn.clicked.connect(self._on_blur_color_btn)
             row2.addWidget(btn)
         self._settings_card.addLayout(row2)
         
@@ -564,18 +603,25 @@ class MainWindow(QMainWindow):
         layout.addStretch()
         return page
     
+    def _on_tab_change(self, idx):
+        if self._tabs.widget(idx) is self._settings_page and self._settings_page_layout.count() == 0:
+            self._settings_page_layout.addWidget(self._create_settings_page())
+    
     def _on_opacity_change(self, value):
+        if value == self._opacity:
+            return
         self._opacity = value
         self._opacity_label.setText(str(value))
-        self._settings.setValue("opacity", value)
-        self._apply_effects()
+        self._queue_setting("opacity", value)
+        self._effects_timer.start()
     
     def _on_dark_mode_change(self, checked: bool = None):
-        if checked is not None:
-            self._dark_mode = checked
-        else:
-            self._dark_mode = self._dark_mode_toggle.isChecked()
-        self._settings.setValue("dark_mode", self._dark_mode)
+        new = self._dark_mode_toggle.isChecked() if checked is None else checked
+        # 未发生变化时跳过，重设整个窗口的样式表会重新 polish 所有子控件
+        if new == self._dark_mode:
+            return
+        self._dark_mode = new
+        self._queue_setting("dark_mode", self._dark_mode)
         
         # 更新 Toggle 样式
         self._dark_mode_toggle.setDarkMode(self._dark_mode)
@@ -584,7 +630,7 @@ class MainWindow(QMainWindow):
         set_dark_mode(self._dark_mode)
         
         # 更新全局样式表
-        self.setStyleSheet(get_stylesheet(self._dark_mode))
+        self._set_window_stylesheet(STYLESHEETS[self._dark_mode])
         
         # 更新主题相关样式
         self._update_theme_styles()
@@ -597,31 +643,52 @@ class MainWindow(QMainWindow):
     
     def _update_card_styles(self):
         """更新所有卡片的标题样式"""
-        # 设置页面的卡片
-        if hasattr(self, '_settings_card'):
-            self._settings_card.update_title_style(self._dark_mode)
-        
-        # 遍历主页面的所有卡片
-        for card in self.findChildren(Card):
+        for card in self._cards:
             card.update_title_style(self._dark_mode)
     
+    def _on_blur_color_btn(self):
+        self._set_blur_color(self.sender().property("blurColor"))
+    
     def _set_blur_color(self, color):
+        if color == self._blur_color:
+            return
         self._blur_color = color
-        self._settings.setValue("blur_color", color)
-        self._apply_effects()
+        self._queue_setting("blur_color", color)
+        self._effects_timer.start()
+    
+    def _queue_setting(self, key, value):
+        """记录待写入的设置项，并重新开始计时"""
+        self._pending_settings[key] = value
+        self._settings_flush.start()
+    
+    def _flush_settings(self):
+        """把待写入的设置项一次性写入 QSettings"""
+        self._settings_flush.stop()
+        if not self._pending_settings:
+            return
+        for key, value in self._pending_settings.items():
+            self._settings.setValue(key, value)
+        self._pending_settings.clear()
+        self._settings.sync()
+    
+    def closeEvent(self, event):
+        """关闭窗口前写入尚未保存的设置，并释放特征提取进程池"""
+        self._flush_settings()
+        self._adv_engine.close()
+        super().closeEvent(event)
     
     def _reset_settings(self):
-        self._opacity = 120
+        # 透明度由滑块的 valueChanged 回调更新（同时刷新数值标签）
         self._blur_color = 0xE8E8E8
         self._dark_mode = False
         self._opacity_slider.setValue(120)
         self._dark_mode_toggle.setChecked(False)
         self._dark_mode_toggle.setDarkMode(False)
-        self._settings.setValue("opacity", 120)
-        self._settings.setValue("blur_color", 0xE8E8E8)
-        self._settings.setValue("dark_mode", False)
+        self._queue_setting("opacity", 120)
+        self._queue_setting("blur_color", 0xE8E8E8)
+        self._queue_setting("dark_mode", False)
         set_dark_mode(False)
-        self.setStyleSheet(get_stylesheet(False))
+        self._set_window_stylesheet(STYLESHEETS[False])
         self._update_theme_styles()
         self._update_card_styles()
         self._apply_effects()
@@ -629,6 +696,7 @@ class MainWindow(QMainWindow):
     
     def _setup_folder_card(self, layout):
         card = Card("选择文件夹")
+        self._cards.append(card)
         
         row = QHBoxLayout()
         row.setSpacing(12)
@@ -677,6 +745,7 @@ class MainWindow(QMainWindow):
     
     def _setup_settings_card(self, layout):
         card = Card("分类设置")
+        self._cards.append(card)
         
         row = QHBoxLayout()
         row.setSpacing(12)
@@ -734,7 +803,7 @@ class MainWindow(QMainWindow):
             lbl = QLabel(f"{default}%")
             lbl.setMinimumWidth(40)
             grid.addWidget(lbl, i, 2)
-            slider.valueChanged.connect(lambda v, l=lbl: l.setText(f"{v}%"))
+            slider.valueChanged.connect(partial(_set_percent_text, lbl))
             self._feature_sliders[key] = slider
         
         self._hue_slider = self._feature_sliders["hue"]
@@ -748,6 +817,7 @@ class MainWindow(QMainWindow):
     
     def _setup_progress_card(self, layout):
         card = Card("处理进度")
+        self._cards.append(card)
         
         self._progress = QProgressBar()
         self._progress.setRange(0, 100)
@@ -769,6 +839,7 @@ class MainWindow(QMainWindow):
     
     def _setup_preview_card(self, layout):
         card = Card("分类预览")
+        self._cards.append(card)
         
         self._preview_scroll = QScrollArea()
         self._preview_scroll.setWidgetResizable(True)
@@ -814,6 +885,7 @@ class MainWindow(QMainWindow):
             return
         
         self._set_enabled(False)
+        self._progress.setRange(0, 100)
         self._progress.setValue(0)
         self._status_lbl.setText("正在扫描...")
         self._file_lbl.setText("")
@@ -826,20 +898,27 @@ class MainWindow(QMainWindow):
             )
             self._adv_engine.set_feature_weights(weights)
             n = None if self._auto_btn.isChecked() else self._cluster_spin.value()
-            self._worker = Worker(self._adv_engine, src, src, n, True)
+            self._worker = WorkerRunnable(self._adv_engine, src, src, n, True)
         else:
-            self._worker = Worker(self._engine, src, advanced=False)
+            self._worker = WorkerRunnable(self._engine, src, advanced=False)
         
-        self._worker.progress.connect(self._on_progress)
-        self._worker.finished.connect(self._on_finished)
-        self._worker.error.connect(self._on_error)
-        self._worker.start()
+        self._worker.signals.progress.connect(self._on_progress)
+        self._worker.signals.finished.connect(self._on_finished)
+        self._worker.signals.error.connect(self._on_error)
+        self._pool.start(self._worker)
     
     def _on_progress(self, cur, total, fname):
         if total > 0:
-            self._progress.setValue(int(cur / total * 100))
-            self._status_lbl.setText(f"处理中: {cur}/{total}")
-            self._file_lbl.setText(fname)
+            # 进度条直接以总数为上限，数值未变时 Qt 不会重绘
+            if self._progress.maximum() != total:
+                self._progress.setMaximum(total)
+            self._progress.setValue(cur)
+            # 标签只在文字变化时更新，避免重复触发布局和重绘
+            status = f"处理中: {cur}/{total}"
+            if status != self._status_lbl.text():
+                self._status_lbl.setText(status)
+            if fname != self._file_lbl.text():
+                self._file_lbl.setText(fname)
     
     def _on_finished(self, result):
         self._set_enabled(True)
@@ -1016,9 +1095,8 @@ class MainWindow(QMainWindow):
             for i, fname in enumerate(files):
                 fpath = os.path.join(path, fname)
                 try:
-                    pixmap = QPixmap(fpath)
-                    if not pixmap.isNull():
-                        pixmap = pixmap.scaled(80, 80, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                    pixmap = self._thumb_pixmap(fpath)
+                    if pixmap is not None:
                         lbl = QLabel()
                         lbl.setPixmap(pixmap)
                         lbl.setStyleSheet("border: 1px solid rgba(0,0,0,0.1); border-radius: 4px; padding: 2px;")
@@ -1028,6 +1106,20 @@ class MainWindow(QMainWindow):
         except:
             pass
     
+    def _thumb_pixmap(self, fpath):
+        """读取缩放后的缩略图，结果放入 QPixmapCache，重复展开或再次分类时不再解码"""
+        size = self.THUMB_SIZE
+        # 键中带上修改时间，同一路径换成了别的文件时不会取到旧图
+        key = f"{fpath}|{os.stat(fpath).st_mtime_ns}|{size}x{size}"
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = QPixmap(fpath)
+            if pixmap.isNull():
+                return None
+            pixmap = pixmap.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+    
     def _clear_preview(self):
         while self._preview_layout.count() > 0:
             item = self._preview_layout.takeAt(0)
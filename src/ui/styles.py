@@ -163,6 +163,10 @@ def get_stylesheet(dark_mode: bool = False) -> str:
     """
 
 
+# 两套全局样式表只生成一次，按 dark_mode 下标取用
+STYLESHEETS = (get_stylesheet(False), get_stylesheet(True))
+
+
 def get_button_styles(dark_mode: bool = False):
     """获取按钮样式"""
     c = COLORS_DARK if dark_mode else COLORS_LIGHT
@@ -254,6 +258,53 @@ CLOSE_BTN = f"""
     QPushButton:pressed {{ background: #F1707A; color: white; }}
 """
 
+
+def _titlebar_title_style(c: dict) -> str:
+    return f"font-size: 13px; color: {c['text']}; background: transparent;"
+
+
+def _titlebar_btn_style(c: dict) -> str:
+    return f"""
+    QPushButton {{
+        background: transparent;
+        border: none;
+        color: {c['text']};
+        font-size: 12px;
+    }}
+    QPushButton:hover {{
+        background: {c['titlebar_hover']};
+    }}
+    QPushButton:pressed {{
+        background: {c['border_strong']};
+    }}
+"""
+
+
+def _titlebar_close_style(c: dict) -> str:
+    return f"""
+    QPushButton {{
+        background: transparent;
+        border: none;
+        color: {c['text']};
+        font-size: 12px;
+    }}
+    QPushButton:hover {{
+        background: #E81123;
+        color: white;
+    }}
+    QPushButton:pressed {{
+        background: #F1707A;
+        color: white;
+    }}
+"""
+
+
+# 自定义标题栏的标题与窗口控制按钮，只取决于深浅色，预先生成两套，按 dark_mode 下标取用
+TITLEBAR_TITLE_CSS = (_titlebar_title_style(COLORS_LIGHT), _titlebar_title_style(COLORS_DARK))
+TITLEBAR_BTN_CSS = (_titlebar_btn_style(COLORS_LIGHT), _titlebar_btn_style(COLORS_DARK))
+TITLEBAR_CLOSE_CSS = (_titlebar_close_style(COLORS_LIGHT), _titlebar_close_style(COLORS_DARK))
+
+
 # 卡片样式
 def get_card_style(opacity: int = 200) -> str:
     alpha = min(0.5 + (255 - opacity) / 255 * 0.35, 0.85)